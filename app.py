@@ -1,57 +1,110 @@
 import sys
-import subprocess
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QMessageBox, QLabel, QLineEdit, QHBoxLayout, QCheckBox, QGridLayout, QGroupBox
-
-def call_cli_tool(file_paths, output_dir, lambda_, wp, whittaker, xmin, xmax, threshold, multiply, add, intensities, overlay, nosave, save,show_summary):
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QMessageBox, QLabel, QLineEdit, QHBoxLayout, QCheckBox, QGridLayout, QGroupBox, QProgressBar, QPlainTextEdit
+from raman_tl.cli import export_data, save_plots, lambda_type
+from raman_tl.processing import Options, RunResult, process_spectrum
+from raman_tl.parallel import process_file
+from raman_tl.smoothing import parse_wp
+
+def parse_value(text, name, type_=float, default=None):
+    # 空白欄位使用預設值，格式錯誤時拋出 ValueError（含欄位名稱），Lambda 可輸入 auto
+    text = text.strip()
+    if not text:
+        return default
     try:
-        # 路徑修改為你的虛擬環境激活腳本路徑
-        venv_activate = "env\\Scripts\\activate.bat"
-        cli_tool = "raman_tl\\raman-tl.py"
-
-        # 構建命令參數
-        cmd = f' python {cli_tool} {" ".join(file_paths)} -l {lambda_} -w {whittaker}'
-        if output_dir:
-            cmd += f' -od {output_dir}'
-        if wp:
-            cmd += f' -p {wp}'
-        if xmin:
-            cmd += f' -xmin {xmin}'
-        if xmax:
-            cmd += f' -xmax {xmax}'
-        if threshold:
-            cmd += f' -t {threshold}'
-        if multiply:
-            cmd += f' -m {multiply}'
-        if add:
-            cmd += f' -a {add}'
-        if intensities:
-            cmd += f' -i {intensities}'
-        if overlay:
-            cmd += ' -o'
-        if nosave:
-            cmd += ' -n'
-        if save:
-            cmd += f' -s {save}'
-        if show_summary:
-            cmd += ' -ss'
-        # print(cmd)
-        # 使用 subprocess.run 執行虛擬環境並執行 CLI 工具
-        result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(e.stderr)
-        QMessageBox.critical(None, "錯誤", f"處理檔案時發生錯誤：\n{e.stderr}")
-
-def process_files(file_paths, output_dir, lambda_, wp, whittaker, xmin, xmax, threshold, multiply, add, intensities, overlay, nosave, save,show_summary):
-    
-    call_cli_tool(file_paths, output_dir, lambda_, wp, whittaker, xmin, xmax, threshold, multiply, add, intensities, overlay, nosave, save,show_summary)
-    QMessageBox.information(None, "完成", "所有檔案已處理完畢")
+        return type_(text)
+    except ValueError:
+        raise ValueError(f'{name}：「{text}」不是有效的數值')
+
+def use_agg():
+    # matplotlib 只在需要繪圖時載入（只輸出資料時完全不載入）
+    # 背景執行緒只能用 Agg 繪圖，Summary 視窗在主執行緒以 Qt 畫布顯示
+    import matplotlib
+    matplotlib.use('Agg')
+
+def command_line(options, file_paths):
+    # Summary 圖上顯示的參數，與命令列選項相同
+    line = f'raman-tl ({len(file_paths)} files) -l {options.lam} -w {options.whittaker_lmd}'
+    for flag, value in (('-p', options.wp and f'{options.wp[0]}:{options.wp[1]}'), ('-xmin', options.xmin), ('-xmax', options.xmax),
+                        ('-t', options.threshold), ('-m', options.multiply), ('-a', options.add), ('-i', options.intensities)):
+        if value:
+            line += f' {flag} {value}'
+    return line
+
+class WarmUp(QThread):
+    # 啟動時在背景預先載入 scipy 與處理模組，第一次處理不必等待載入（matplotlib 在繪圖時才載入）
+    def run(self):
+        import numpy as np
+        x = np.linspace(100, 2000, 200)
+        y = np.exp(-(x - 1000)**2 / 50) * 100 + x / 10
+        process_spectrum('warm-up', x, y, Options(wp=(9, 3)))
+        process_spectrum('warm-up', x, y, Options())
+
+class Worker(QThread):
+    # 在背景執行緒處理檔案，逐檔回報進度，取消後在下一個譜圖之前停止
+    progress = pyqtSignal(int, str)         # 已處理檔案數, 訊息
+    error = pyqtSignal(str)
+    done = pyqtSignal(object)               # RunResult，取消時為 None
+
+    def __init__(self, file_paths, output_dir, options, save_pdf, save_png, save_dat, overlay):
+        super().__init__()
+        self.file_paths = list(file_paths)
+        self.output_dir = output_dir
+        self.options = options
+        self.save_pdf = save_pdf
+        self.save_png = save_png
+        self.save_dat = save_dat
+        self.overlay = overlay
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        run = RunResult(self.options)
+        try:
+            for counter, filename in enumerate(self.file_paths, 1):
+                if self.cancelled:
+                    self.done.emit(None)
+                    return
+                start = time.perf_counter()
+                try:
+                    result = process_file(filename, self.options)
+                except Exception as e:
+                    self.progress.emit(counter, f'{filename}：錯誤 {e}')
+                    continue
+                run.spectra[result.name] = result
+                self.progress.emit(counter, f'{result.name}：{time.perf_counter() - start:.2f} s')
+            if not len(run):
+                self.error.emit('沒有可處理的檔案')
+                return
+            if self.cancelled:
+                self.done.emit(None)
+                return
+            if self.save_dat:
+                export_data(run, self.output_dir)
+            if self.save_pdf or self.save_png:
+                self.progress.emit(len(self.file_paths), '繪圖中…')
+                use_agg()
+                save_plots(run, self.output_dir, command_line(self.options, self.file_paths),
+                           save_pdf=self.save_pdf, save_plots_png=self.save_png, overlay=self.overlay)
+        # export_data 寫入失敗時以 sys.exit 結束
+        except SystemExit:
+            self.error.emit('寫入錯誤')
+            return
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        self.done.emit(run)
 
 class App(QWidget):
     def __init__(self):
         super().__init__()
         self.title = '多檔案處理工具'
         self.initUI()
+        self.warm_up = WarmUp()
+        self.warm_up.start()
     
     def initUI(self):
         self.setWindowTitle(self.title)
@@ -94,6 +147,18 @@ class App(QWidget):
         self.process_button.clicked.connect(self.start_processing)
         layout.addWidget(self.process_button)
 
+        self.cancel_button = QPushButton('取消', self)
+        self.cancel_button.clicked.connect(self.cancel_processing)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+
+        self.progress_bar = QProgressBar(self)
+        layout.addWidget(self.progress_bar)
+
+        self.log = QPlainTextEdit(self)
+        self.log.setReadOnly(True)
+        layout.addWidget(self.log)
+
         self.advanced_button = QPushButton('顯示進階功能', self)
         self.advanced_button.clicked.connect(self.toggle_advanced)
         layout.addWidget(self.advanced_button)
@@ -193,29 +258,96 @@ class App(QWidget):
     
     def start_processing(self):
         if hasattr(self, 'file_paths') and self.output_dir_line_edit.text():
-            lambda_ = self.lambda_line_edit.text()
-            wp = self.wp_line_edit.text()
-            whittaker = self.whittaker_line_edit.text()
-            xmin = self.xmin_line_edit.text()
-            xmax = self.xmax_line_edit.text()
-            threshold = self.threshold_line_edit.text()
-            multiply = self.multiply_line_edit.text()
-            add = self.add_line_edit.text()
-            intensities = self.intensities_line_edit.text()
+            try:
+                wp = self.wp_line_edit.text().strip()
+                try:
+                    wp = parse_wp(wp) if wp else None
+                except ValueError:
+                    raise ValueError(f'Savitzky–Golay參數：「{wp}」格式為 窗口長度:多項式階數')
+                options = Options(lam=parse_value(self.lambda_line_edit.text(), 'Lambda', lambda_type(int), 1000),
+                                  whittaker_lmd=parse_value(self.whittaker_line_edit.text(), 'Whittaker參數', lambda_type(float), 1),
+                                  wp=wp,
+                                  xmin=parse_value(self.xmin_line_edit.text(), 'xmin'),
+                                  xmax=parse_value(self.xmax_line_edit.text(), 'xmax'),
+                                  threshold=parse_value(self.threshold_line_edit.text(), '閾值'),
+                                  multiply=parse_value(self.multiply_line_edit.text(), '強度乘數'),
+                                  add=parse_value(self.add_line_edit.text(), '波數加值'),
+                                  intensities=parse_value(self.intensities_line_edit.text(), '強度加值', float, 0))
+            except ValueError as e:
+                QMessageBox.critical(self, "錯誤", f"參數錯誤：\n{e}")
+                return
             overlay = self.overlay_checkbox.isChecked()
-            nosave = self.nosave_checkbox.isChecked()
-            save=''
-            if self.save_data_checkbox.isChecked():
-                save += 'd'
-            if self.save_img_checkbox.isChecked():
-                save += 'p'
+            save_pdf = not self.nosave_checkbox.isChecked()
+            save_dat = self.save_data_checkbox.isChecked()
+            save_png = self.save_img_checkbox.isChecked()
             show_summary = self.show_summary_checkbox.isChecked()
-            # save = self.save_line_edit.text()
-            
-            process_files(self.file_paths, self.output_dir_line_edit.text(), lambda_, wp, whittaker, xmin, xmax, threshold, multiply, add, intensities, overlay, nosave, save,show_summary)
+
+            self.show_summary = show_summary
+            self.log.clear()
+            self.progress_bar.setRange(0, len(self.file_paths))
+            self.progress_bar.setValue(0)
+            self.process_button.setEnabled(False)
+            self.cancel_button.setEnabled(True)
+            self.start_time = time.perf_counter()
+            self.worker = Worker(self.file_paths, self.output_dir_line_edit.text(), options, save_pdf, save_png, save_dat, overlay)
+            self.worker.progress.connect(self.on_progress)
+            self.worker.error.connect(self.on_error)
+            self.worker.done.connect(self.on_done)
+            self.worker.start()
         else:
             QMessageBox.warning(self, "錯誤", "請選擇檔案和輸出目錄")
 
+    def cancel_processing(self):
+        self.worker.cancel()
+        self.cancel_button.setEnabled(False)
+        self.log.appendPlainText('取消中…')
+
+    def on_progress(self, counter, message):
+        self.progress_bar.setValue(counter)
+        self.log.appendPlainText(message)
+
+    def finish_processing(self):
+        self.process_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def on_error(self, message):
+        self.finish_processing()
+        QMessageBox.critical(self, "錯誤", f"處理檔案時發生錯誤：\n{message}")
+
+    def on_done(self, run):
+        self.finish_processing()
+        elapsed = time.perf_counter() - self.start_time
+        if run is None:
+            self.log.appendPlainText(f'已取消（{elapsed:.1f} s）')
+            return
+        self.log.appendPlainText(f'完成：{len(run)} 個檔案，{elapsed:.1f} s')
+        if self.show_summary:
+            self.show_summary_plot(run)
+        QMessageBox.information(self, "完成", "所有檔案已處理完畢")
+
+    def show_summary_plot(self, run):
+        # Summary 圖在主執行緒建立，嵌入 Qt 視窗
+        use_agg()
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+        from raman_tl import plotting
+        # 檔案很多時只顯示第一頁，完整的 Summary 在 summary.pdf
+        pages = plotting.summary_pages(run)
+        fig = plotting.plot_summary(pages[0], command_line(run.options, self.worker.file_paths))
+        plt.close(fig)
+        self.summary_canvas = FigureCanvasQTAgg(fig)
+        self.summary_canvas.setWindowTitle('Summary' if len(pages) == 1 else f'Summary (1 / {len(pages)})')
+        self.summary_canvas.show()
+
+    def closeEvent(self, event):
+        # 關閉視窗前停止並等待背景執行緒，執行中的 QThread 不能被銷毀
+        worker = getattr(self, 'worker', None)
+        if worker is not None and worker.isRunning():
+            worker.cancel()
+            worker.wait()
+        self.warm_up.wait()
+        event.accept()
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     ex = App()
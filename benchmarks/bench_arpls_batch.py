@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+batched arPLS (baseline_arPLS_batch) vs. one baseline_arPLS call per spectrum
+
+simulates a Raman map: n spectra on the same wavenumber grid
+
+usage: python benchmarks/bench_arpls_batch.py [-n SPECTRA] [-p POINTS]
+'''
+
+import os                                               #path of the raman_tl package
+import sys                                              #sys
+import argparse                                         #argument parser
+import time                                             #timing
+import numpy as np                                      #for several calculations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from raman_tl.baseline import baseline_arPLS, baseline_arPLS_batch
+from bench_arpls_solver import synthetic_spectrum       #synthetic Raman spectrum
+
+#n spectra: scaled and shifted copies of one synthetic spectrum with independent noise
+def synthetic_map(n, L, seed=0):
+    rng = np.random.default_rng(seed)
+    _, y = synthetic_spectrum(L)
+    scale = rng.uniform(0.5, 2, (n, 1))
+    shift = rng.uniform(-100, 100, (n, 1))
+    return y * scale + shift + rng.normal(0, 5, (n, L))
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark batched arPLS')
+    parser.add_argument('-n', '--spectra', type=int, default=1000, help='number of spectra')
+    parser.add_argument('-p', '--points', type=int, default=1000, help='points per spectrum')
+    args = parser.parse_args()
+
+    Y = synthetic_map(args.spectra, args.points)
+
+    t0 = time.perf_counter()
+    Z_batch = baseline_arPLS_batch(Y)
+    t_batch = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    Z_single = np.array([baseline_arPLS(y) for y in Y])
+    t_single = time.perf_counter() - t0
+
+    print(f"{args.spectra} spectra x {args.points} points")
+    print(f"per spectrum: {t_single:8.3f} s")
+    print(f"batched:      {t_batch:8.3f} s ({t_single / t_batch:.1f}x)")
+    print(f"max. deviation: {np.max(np.abs(Z_batch - Z_single)):.3e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+per-iteration cost of the arPLS solver backends (banded Cholesky vs. SuperLU)
+
+usage: python benchmarks/bench_arpls_solver.py [-r REPEAT] [-l LAMBDA]
+'''
+
+import os                                               #path of the raman_tl package
+import sys                                              #sys
+import argparse                                         #argument parser
+import time                                             #timing
+import numpy as np                                      #for several calculations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from raman_tl import solvers                            #solver backends
+
+sizes = (2_000, 20_000, 200_000)            #number of points per spectrum
+
+#synthetic Raman spectrum: curved baseline + lorentzian peaks + noise
+def synthetic_spectrum(L, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(200, 3200, L)
+    baseline = 500 + 0.2 * (x - 200) - 4e-5 * (x - 200)**2
+    peaks = sum(a / (1 + ((x - c) / g)**2) for a, c, g in
+                ((800, 520, 6), (300, 1001, 4), (450, 1600, 10), (200, 2900, 15)))
+    return x, baseline + peaks + rng.normal(0, 5, L)
+
+#median time of one (W + H) z = W y solve in ms, first call includes setup (penalty matrix)
+def time_solver(name, y, w, lam, repeat):
+    solve = solvers.get_solver(name)
+    solvers.penalty_band.cache_clear()
+    solvers.penalty_matrix.cache_clear()
+    t0 = time.perf_counter()
+    solve(w, y, lam)
+    first = time.perf_counter() - t0
+    times = list()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        solve(w, y, lam)
+        times.append(time.perf_counter() - t0)
+    return first * 1e3, np.median(times) * 1e3
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark arPLS solver backends')
+    parser.add_argument('-r', '--repeat', type=int, default=20, help='iterations per size')
+    parser.add_argument('-l', '--lambda', type=float, dest='lambda_', default=1000, help='lambda for arPLS')
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'solver':>8} {'first call / ms':>16} {'per iteration / ms':>19} {'speedup':>8}")
+    for L in sizes:
+        _, y = synthetic_spectrum(L)
+        #typical arPLS weights after the first iteration
+        w = np.random.default_rng(1).uniform(0, 1, L)
+        reference = None
+        for name in ('superlu', 'banded'):
+            first, per_iter = time_solver(name, y, w, args.lambda_, args.repeat)
+            if reference is None:
+                reference = per_iter
+            print(f"{L:>8} {name:>8} {first:>16.3f} {per_iter:>19.3f} {reference / per_iter:>7.1f}x")
+        #both backends must give the same baseline
+        deviation = np.max(np.abs(solvers.solve_banded(w, y, args.lambda_) - solvers.solve_superlu(w, y, args.lambda_)))
+        print(f"{'':>8} max. deviation banded vs. superlu: {deviation:.3e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+warm started arPLS (arPLS_fit / arPLS_sweep): iterations saved per spectrum
+
+lambda sweep: every lambda of a log grid starts from the weights of the previous lambda
+consecutive spectra: every spectrum of a synthetic map starts from the weights of the previous spectrum
+
+usage: python benchmarks/bench_arpls_warm.py [-n SPECTRA] [-p POINTS] [files ...]
+'''
+
+import os                                               #path of the raman_tl package
+import sys                                              #sys
+import argparse                                         #argument parser
+import time                                             #timing
+import numpy as np                                      #for several calculations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from raman_tl import load_spectrum, spectrum_name       #read spectra
+from raman_tl.baseline import arPLS_fit, arPLS_sweep    #warm started arPLS
+from bench_arpls_batch import synthetic_map             #synthetic Raman map
+
+lams = np.logspace(2, 6, 9)                 #lambda grid of the sweep
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark warm started arPLS')
+    parser.add_argument('files', nargs='*', help='spectra for the lambda sweep (default: synthetic)')
+    parser.add_argument('-n', '--spectra', type=int, default=20, help='number of synthetic spectra')
+    parser.add_argument('-p', '--points', type=int, default=1000, help='points per synthetic spectrum')
+    args = parser.parse_args()
+
+    Y = synthetic_map(args.spectra, args.points)
+    if args.files:
+        spectra = [(spectrum_name(filename), load_spectrum(filename)[1]) for filename in args.files]
+    else:
+        spectra = [(f"synthetic {index}", y) for index, y in enumerate(Y[:5])]
+
+    print("lambda sweep " + ", ".join(f"{lam_:g}" for lam_ in lams))
+    print(f"{'spectrum':>16} {'cold':>6} {'warm':>6} {'saved':>7} {'max. dev.':>10}")
+    for name, y in spectra:
+        Z_cold, cold = arPLS_sweep(y, lams, warm=False)
+        Z_warm, warm = arPLS_sweep(y, lams)
+        deviation = np.max(np.abs(Z_warm - Z_cold)) / np.ptp(y)
+        print(f"{name:>16} {cold.sum():6d} {warm.sum():6d} {1 - warm.sum() / cold.sum():7.1%} {deviation:10.2e}")
+
+    print(f"\nconsecutive spectra ({args.spectra} x {args.points} points)")
+    print(f"{'spectrum':>16} {'cold':>6} {'warm':>6} {'saved':>7}")
+    w = None
+    t_cold = t_warm = 0
+    for index, y in enumerate(Y):
+        t0 = time.perf_counter()
+        _, _, cold = arPLS_fit(y)
+        t1 = time.perf_counter()
+        _, w, warm = arPLS_fit(y, w=w)
+        t2 = time.perf_counter()
+        t_cold += t1 - t0
+        t_warm += t2 - t1
+        print(f"{index:16d} {cold:6d} {warm:6d} {1 - warm / cold:7.1%}")
+    print(f"time cold: {t_cold:.3f} s, warm: {t_warm:.3f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+automatic lambda selection (V-curve, selection.py): time per spectrum and accuracy
+
+the synthetic spectra have a known baseline, the error of the baseline with the selected
+lambda is compared with the best lambda of the grid and with the default lambda
+
+usage: python benchmarks/bench_auto_lambda.py [-n SPECTRA] [-p POINTS]
+'''
+
+import os                                               #path of the raman_tl package
+import sys                                              #sys
+import argparse                                         #argument parser
+import time                                             #timing
+import numpy as np                                      #for several calculations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from raman_tl.baseline import baseline_arPLS_batch, lam #batched arPLS, default lambda
+from raman_tl.selection import auto_baseline_lambda, baseline_grid  #V-curve
+from bench_arpls_solver import synthetic_spectrum       #synthetic Raman spectrum
+
+#synthetic map with known baselines: random curvature, peaks and noise of synthetic_spectrum
+def synthetic_map_baselines(n, L, seed=0):
+    rng = np.random.default_rng(seed)
+    x, y = synthetic_spectrum(L)
+    base = 500 + 0.2 * (x - 200) - 4e-5 * (x - 200)**2
+    curvature = rng.uniform(-1, 1, (n, 1)) * 1e-4 * (x - 1700)**2
+    baselines = base + curvature
+    return baselines + (y - base) + rng.normal(0, 5, (n, L)), baselines
+
+#rms error of the baselines of Y with lambda (one or one per row) against the true baselines
+def rms_error(Y, baselines, lam_):
+    return np.sqrt(np.mean((baseline_arPLS_batch(Y, lam=lam_) - baselines)**2, axis=1))
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark automatic lambda selection')
+    parser.add_argument('-n', '--spectra', type=int, default=300, help='number of spectra')
+    parser.add_argument('-p', '--points', type=int, default=1000, help='points per spectrum')
+    args = parser.parse_args()
+
+    Y, baselines = synthetic_map_baselines(args.spectra, args.points)
+
+    t0 = time.perf_counter()
+    selected = auto_baseline_lambda(Y)
+    t_select = time.perf_counter() - t0
+
+    error_auto = rms_error(Y, baselines, selected)
+    error_default = rms_error(Y, baselines, lam)
+    error_grid = np.array([rms_error(Y, baselines, lam_) for lam_ in baseline_grid])
+
+    print(f"{args.spectra} spectra x {args.points} points")
+    print(f"selection: {t_select:.2f} s ({1000 * t_select / args.spectra:.1f} ms per spectrum)")
+    print("selected lambdas: " + ", ".join(f"{lam_:g} ({count})" for lam_, count in
+                                           zip(*np.unique(selected, return_counts=True))))
+    print(f"rms baseline error, default lambda {lam}: {np.median(error_default):8.2f} (median)")
+    print(f"rms baseline error, selected lambda:   {np.median(error_auto):8.2f} (median)")
+    print(f"rms baseline error, best grid lambda:  {np.median(error_grid.min(axis=0)):8.2f} (median)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+spectrum file loader: bulk parser (load_spectrum) vs. the former line by line loop
+
+writes n files of 2,000 lines (format of test.txt) to a temporary folder
+
+usage: python benchmarks/bench_loader.py [-n FILES] [-p POINTS]
+'''
+
+import os                                               #path of the raman_tl package
+import sys                                              #sys
+import argparse                                         #argument parser
+import tempfile                                         #temporary folder for the files
+import time                                             #timing
+import numpy as np                                      #for several calculations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from raman_tl.fileio import load_spectrum               #bulk parser
+from bench_arpls_solver import synthetic_spectrum       #synthetic Raman spectrum
+
+#former loader: one line at a time, split twice per line
+def load_spectrum_loop(filename):
+    freqlist=list()
+    intenslist=list()
+    with open(filename, "r") as input_file:
+        for line in input_file:
+            freqlist.append(float(line.strip().split()[0]))
+            intenslist.append(float(line.strip().split()[1]))
+    return freqlist, intenslist
+
+#time to load all files in s
+def time_loader(loader, filenames):
+    t0 = time.perf_counter()
+    for filename in filenames:
+        loader(filename)
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark the spectrum file loader')
+    parser.add_argument('-n', '--files', type=int, default=10_000, help='number of files')
+    parser.add_argument('-p', '--points', type=int, default=2_000, help='lines per file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        x, y = synthetic_spectrum(args.points)
+        text = "".join(f"{wn:.0f}\t{intens:.7f}\n" for wn, intens in zip(x, y))
+        filenames = list()
+        for index in range(args.files):
+            filename = os.path.join(folder, f"spectrum{index}.txt")
+            with open(filename, "w") as output_file:
+                output_file.write(text)
+            filenames.append(filename)
+
+        #both loaders must read the same values
+        freq, intens = load_spectrum(filenames[0])
+        freqlist, intenslist = load_spectrum_loop(filenames[0])
+        assert np.array_equal(freq, freqlist) and np.array_equal(intens, intenslist)
+
+        t_loop = time_loader(load_spectrum_loop, filenames)
+        t_bulk = time_loader(load_spectrum, filenames)
+
+    print(f"{args.files} files x {args.points} lines")
+    print(f"line loop:   {t_loop:8.3f} s ({t_loop / args.files * 1e3:.3f} ms per file)")
+    print(f"bulk parser: {t_bulk:8.3f} s ({t_bulk / args.files * 1e3:.3f} ms per file, {t_loop / t_bulk:.1f}x)")
+
+if __name__ == '__main__':
+    main()
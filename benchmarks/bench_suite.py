@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+benchmark suite of the hot paths with accuracy checks
+
+synthetic Raman spectra with known baseline and peaks (synthetic_raman), timed per size:
+  points (1k - 1M):  arPLS, Whittaker, Savitzky–Golay, crop index lookup, peak detection,
+                     CSV export (save_dat), PDF export (one page, plot_spectrum + savefig)
+  files (1 - 10k):   loader (load_spectra) and baseline_arPLS_batch (2,000 points per spectrum)
+
+accuracy checks (exit code 1 if one fails), the current implementations against references:
+  arPLS banded and superlu solver vs. the former spdiags/spsolve arPLS, baseline_arPLS_batch vs.
+  baseline_arPLS (many distinct rows, one lambda per row), Whittaker vs. scipy.sparse solve,
+  savgol vs. scipy.signal.savgol_filter, crop_indices vs. argmin, peaks vs. the known peaks,
+  save_dat vs. "{:.3f},{:.2f}" lines, load_spectrum vs. the former line loop,
+  arPLS baseline vs. the known baseline (rms error below the noise level)
+
+golden values: --save FILE stores the outputs of a fixed spectrum, --check FILE compares
+a later version (e.g. a faster engine) with them, any drift above the tolerances fails
+
+usage: python benchmarks/bench_suite.py [--full] [-p POINTS,...] [-n FILES,...] [-r REPEAT]
+                                        [--save FILE | --check FILE] [--json FILE]
+'''
+
+import os                                               #path of the raman_tl package
+import sys                                              #sys
+import argparse                                         #argument parser
+import json                                             #json results
+import tempfile                                         #temporary folder for the files
+import time                                             #timing
+import warnings                                         #efficiency warning of the former arPLS
+import numpy as np                                      #for several calculations
+from scipy import sparse                                #Whittaker reference
+from scipy.sparse.linalg import spsolve                 #Whittaker reference
+from scipy.sparse import linalg                         #former arPLS
+from scipy.special import expit                         #former arPLS
+from scipy.signal import savgol_filter                  #Savitzky–Golay reference
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from raman_tl.fileio import load_spectrum, load_spectra, save_dat   #loader, CSV export
+from raman_tl.baseline import baseline_arPLS, baseline_arPLS_batch  #arPLS
+from raman_tl.smoothing import whittaker, savgol        #smoothing
+from raman_tl.processing import Options, crop_indices, peak_threshold, detect_peaks, process_spectrum
+from bench_loader import load_spectrum_loop             #former loader
+
+points_quick = (1_000, 10_000, 100_000)     #points per spectrum, default
+points_full = (1_000, 10_000, 100_000, 1_000_000)   #points per spectrum, --full
+files_quick = (1, 100, 1_000)               #number of files, default
+files_full = (1, 100, 1_000, 10_000)        #number of files, --full
+file_points = 2_000                         #points per file of the file benchmarks
+check_points = 2_000                        #points of the accuracy checks (density of test.txt, fits the default lambda)
+check_rows = 64                             #spectra of the baseline_arPLS_batch check
+check_chunk = 16                            #rows per arPLS_rows call of the check (several chunks)
+pdf_max_points = 100_000                    #largest spectrum of the PDF export
+peak_centers = (520, 1001, 1600, 2900)      #known peaks of the synthetic spectra
+noise = 5                                   #noise level of the synthetic spectra
+golden_points = 2_000                       #points of the golden values
+golden_tolerance = {'baseline': 1e-6, 'whittaker': 1e-9, 'savgol': 1e-9, 'filtered': 1e-6,
+                    'crop': 0, 'peaks': 0}  #max. relative deviation from the golden values
+
+#synthetic Raman spectrum with known baseline and peaks: curved baseline + lorentzian peaks + noise
+#returns wave numbers, intensities and the baseline
+def synthetic_raman(L, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(200, 3200, L)
+    baseline = 500 + 0.2 * (x - 200) - 4e-5 * (x - 200)**2
+    peaks = sum(a / (1 + ((x - c) / g)**2) for a, c, g in
+                zip((800, 300, 450, 200), peak_centers, (6, 4, 10, 15)))
+    return x, baseline + peaks + rng.normal(0, noise, L), baseline
+
+#median wall time of function() in s over repeat calls
+def median_time(function, repeat):
+    times = list()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+#former arPLS (sparse spdiags/spsolve), kept verbatim as the reference of the banded solvers
+def baseline_arPLS_reference(y, ratio=1e-6, lam=1000, niter=200):
+    L = len(y)
+    diag = np.ones(L - 2)
+    D = sparse.spdiags([diag, -2*diag, diag], [0, -1, -2], L, L - 2)
+    H = lam * D.dot(D.T)
+    w = np.ones(L)
+    W = sparse.spdiags(w, 0, L, L)
+    crit = 1
+    count = 0
+    while crit > ratio:
+        z = linalg.spsolve(W + H, W * y)
+        d = y - z
+        dn = d[d < 0]
+        m = np.mean(dn)
+        s = np.std(dn)
+        w_new = expit(-2 * (d - (2*s - m))/s)
+        crit = np.linalg.norm(w_new - w) / np.linalg.norm(w)
+        w = w_new
+        W.setdiag(w)
+        count += 1
+        if count > niter:
+            break
+    return z
+
+#Whittaker reference: (I + lmd D'D) z = y with scipy.sparse, independent of raman_tl.solvers
+def whittaker_reference(y, lmd, d=2):
+    L = len(y)
+    D = sparse.eye(L, format='csr')
+    for _ in range(d):
+        D = D[1:] - D[:-1]
+    return spsolve(sparse.csc_matrix(sparse.eye(L) + lmd * D.T @ D), y)
+
+#one PDF page of a processed spectrum
+def export_pdf(result, filename):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+    from raman_tl.plotting import plot_spectrum
+    with PdfPages(filename) as pdf:
+        fig = plot_spectrum(result, result.options)
+        pdf.savefig(fig)
+        plt.close(fig)
+
+#time the point benchmarks of every size, returns rows (benchmark, size, seconds)
+def time_points(sizes, repeat, folder):
+    rows = list()
+    for L in sizes:
+        x, y, _ = synthetic_raman(L)
+        z = baseline_arPLS(y)
+        filtered = whittaker(y - z, lmd=1)
+        threshold = peak_threshold(filtered)
+        cases = {'arPLS': lambda: baseline_arPLS(y),
+                 'whittaker': lambda: whittaker(y - z, lmd=1),
+                 'savgol': lambda: savgol(y - z, 9, 3),
+                 'crop': lambda: crop_indices(x, 400, 1800),
+                 'peaks': lambda: detect_peaks(filtered, height=threshold),
+                 'csv export': lambda: save_dat(os.path.join(folder, 'bench-mod.csv'), x, filtered)}
+        if L <= pdf_max_points:
+            result = process_spectrum('bench', x, y, Options())
+            cases['pdf export'] = lambda: export_pdf(result, os.path.join(folder, 'bench.pdf'))
+        for name, function in cases.items():
+            #arPLS and PDF export are slow for large spectra
+            rows.append((name, L, median_time(function, 1 if name in ('arPLS', 'pdf export') and L > 10_000
+                                              else repeat)))
+            print(f"{name:<16}{L:>10}{rows[-1][2] * 1e3:>14.3f}")
+    return rows
+
+#time the file benchmarks of every number of files, returns rows (benchmark, files, seconds)
+def time_files(counts, folder):
+    rows = list()
+    x, y, _ = synthetic_raman(file_points)
+    text = "".join(f"{wn:.3f}\t{intens:.4f}\n" for wn, intens in zip(x, y))
+    filenames = list()
+    for n in counts:
+        while len(filenames) < n:
+            filename = os.path.join(folder, f"spectrum{len(filenames)}.txt")
+            with open(filename, "w") as output_file:
+                output_file.write(text)
+            filenames.append(filename)
+        t0 = time.perf_counter()
+        _, intensdict = load_spectra(filenames[:n])
+        rows.append(('loader', n, time.perf_counter() - t0))
+        print(f"{'loader':<16}{n:>10}{rows[-1][2] * 1e3:>14.3f}")
+        Y = np.array(list(intensdict.values())) + np.random.default_rng(1).normal(0, noise, (n, file_points))
+        t0 = time.perf_counter()
+        baseline_arPLS_batch(Y)
+        rows.append(('arPLS batch', n, time.perf_counter() - t0))
+        print(f"{'arPLS batch':<16}{n:>10}{rows[-1][2] * 1e3:>14.3f}")
+    return rows
+
+#accuracy checks, returns rows (check, deviation, tolerance, ok)
+def accuracy_checks(folder):
+    checks = list()
+    x, y, baseline = synthetic_raman(check_points)
+    z = baseline_arPLS(y)
+    scale = np.max(np.abs(y))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', sparse.SparseEfficiencyWarning)  #W + H is not CSC, kept as it was
+        reference = baseline_arPLS_reference(y)
+    deviation = np.max(np.abs(z - reference)) / scale
+    checks.append(('arPLS banded vs. former spsolve', deviation, 1e-6))
+    deviation = np.max(np.abs(baseline_arPLS(y, solver='superlu') - reference)) / scale
+    checks.append(('arPLS superlu vs. former spsolve', deviation, 1e-6))
+
+    #distinct rows (noise, scale, offset) and lambdas, so the rows converge after different iterations
+    rng = np.random.default_rng(3)
+    Y = np.array([synthetic_raman(check_points, seed=seed)[1] for seed in range(check_rows)])
+    Y = Y * rng.uniform(0.5, 2, (check_rows, 1)) + rng.uniform(-100, 100, (check_rows, 1))
+    lams = rng.uniform(500, 5000, check_rows)
+    Z = baseline_arPLS_batch(Y, lam=lams, chunk=check_chunk)
+    deviation = max(np.max(np.abs(Z[i] - baseline_arPLS(Y[i], lam=lams[i]))) / np.max(np.abs(Y[i]))
+                    for i in range(check_rows))
+    checks.append((f"arPLS batch vs. single ({check_rows} rows)", deviation, 1e-6))
+    rms = np.sqrt(np.mean((z - baseline)**2))
+    checks.append(('arPLS vs. known baseline (rms)', rms, 3 * noise))
+
+    corrected = y - z
+    deviation = np.max(np.abs(whittaker(corrected, lmd=1) - whittaker_reference(corrected, 1)))
+    checks.append(('whittaker vs. scipy.sparse', deviation / np.max(np.abs(corrected)), 1e-9))
+    deviation = np.max(np.abs(savgol(corrected, 9, 3) - savgol_filter(corrected, 9, 3)))
+    checks.append(('savgol vs. savgol_filter', deviation, 0))
+
+    targets = np.random.default_rng(2).uniform(x[0], x[-1], 200)
+    wrong = sum(crop_indices(x, target)[0] != np.argmin(np.abs(x - target)) for target in targets)
+    checks.append(('crop_indices vs. argmin', wrong, 0))
+
+    filtered = whittaker(corrected, lmd=1)
+    peaks = x[detect_peaks(filtered, height=peak_threshold(filtered))]
+    missing = sum(np.min(np.abs(peaks - center), initial=np.inf) > 2 * (x[1] - x[0]) for center in peak_centers)
+    checks.append(('known peaks not found', missing, 0))
+
+    filename = os.path.join(folder, 'check-mod.csv')
+    save_dat(filename, x, filtered)
+    with open(filename) as input_file:
+        written = input_file.read()
+    reference = "".join("{:.3f}".format(wn) + "," + "{:.2f}".format(intens) + "\n" for wn, intens in zip(x, filtered))
+    checks.append(('save_dat vs. format lines', int(written != reference), 0))
+
+    filename = os.path.join(folder, 'check.txt')
+    with open(filename, "w") as output_file:
+        output_file.write("".join(f"{wn:.3f}\t{intens:.4f}\n" for wn, intens in zip(x, y)))
+    freq, intens = load_spectrum(filename)
+    freqlist, intenslist = load_spectrum_loop(filename)
+    checks.append(('load_spectrum vs. line loop',
+                   int(not (np.array_equal(freq, freqlist) and np.array_equal(intens, intenslist))), 0))
+    return [(name, float(deviation), tolerance, bool(deviation <= tolerance)) for name, deviation, tolerance in checks]
+
+#outputs of the golden spectrum (default options)
+def golden_values():
+    x, y, _ = synthetic_raman(golden_points)
+    result = process_spectrum('golden', x, y, Options(xmin=400, xmax=1800))
+    return {'baseline': result.baseline, 'whittaker': whittaker(result.corrected, lmd=1),
+            'savgol': savgol(result.corrected, 9, 3), 'filtered': result.filtered,
+            'crop': np.array([result.start, result.stop]), 'peaks': np.asarray(result.peaks)}
+
+#compare the golden values with the saved ones, returns rows (check, deviation, tolerance, ok)
+def golden_checks(filename):
+    values = golden_values()
+    checks = list()
+    with np.load(filename) as saved:
+        for name, tolerance in golden_tolerance.items():
+            if saved[name].shape != values[name].shape:
+                checks.append((f"golden {name} (shape)", np.inf, tolerance, False))
+                continue
+            deviation = float(np.max(np.abs(values[name] - saved[name]), initial=0)
+                              / max(np.max(np.abs(saved[name]), initial=0), 1))
+            checks.append((f"golden {name}", deviation, tolerance, deviation <= tolerance))
+    return checks
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark suite with accuracy checks')
+    parser.add_argument('--full', action='store_true', help='up to 1M points and 10k files')
+    parser.add_argument('-p', '--points', type=str, help='points per spectrum, comma separated')
+    parser.add_argument('-n', '--files', type=str, help='number of files, comma separated')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='repetitions (median)')
+    parser.add_argument('--save', type=str, metavar='FILE', help='save the golden values (.npz)')
+    parser.add_argument('--check', type=str, metavar='FILE', help='compare with saved golden values')
+    parser.add_argument('--json', type=str, metavar='FILE', help='save timings and checks as json')
+    args = parser.parse_args()
+
+    sizes = [int(value) for value in args.points.split(',')] if args.points else \
+        (points_full if args.full else points_quick)
+    counts = [int(value) for value in args.files.split(',')] if args.files else \
+        (files_full if args.full else files_quick)
+
+    if args.save:
+        np.savez(args.save, **golden_values())
+        print(f"golden values saved to {args.save}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{'benchmark':<16}{'size':>10}{'time / ms':>14}")
+        rows = time_points(sizes, args.repeat, folder) + time_files(counts, folder)
+        checks = accuracy_checks(folder)
+    if args.check:
+        checks += golden_checks(args.check)
+
+    print(f"\n{'check':<36}{'deviation':>12}{'tolerance':>12}")
+    for name, deviation, tolerance, ok in checks:
+        print(f"{name:<36}{deviation:>12.3e}{tolerance:>12.3e} {'ok' if ok else 'FAILED'}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump({'timings': [{'benchmark': name, 'size': size, 'seconds': seconds} for name, size, seconds in rows],
+                       'checks': [{'check': name, 'deviation': deviation, 'tolerance': tolerance, 'ok': ok}
+                                  for name, deviation, tolerance, ok in checks]}, output_file, indent=1)
+    sys.exit(0 if all(ok for *_, ok in checks) else 1)
+
+if __name__ == '__main__':
+    main()
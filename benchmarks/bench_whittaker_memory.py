@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+memory regression check for the Whittaker smoother
+
+smooths a 1M point spectrum and fails (exit code 1) if the peak memory
+allocated during the solve exceeds the ceiling (the old dense np.eye(L)
+construction would need 8 TB for this input)
+
+usage: python benchmarks/bench_whittaker_memory.py [-n POINTS] [-c CEILING_MB]
+'''
+
+import os                                               #path of the raman_tl package
+import sys                                              #sys
+import argparse                                         #argument parser
+import time                                             #timing
+import tracemalloc                                      #peak memory of numpy allocations
+import numpy as np                                      #for several calculations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from raman_tl import solvers                            #solver backends
+from raman_tl.smoothing import whittaker                #Whittaker smoother
+
+def main():
+    parser = argparse.ArgumentParser(description='memory check for the Whittaker smoother')
+    parser.add_argument('-n', '--points', type=int, default=1_000_000, help='number of points')
+    parser.add_argument('-c', '--ceiling', type=float, default=200, help='memory ceiling in MB')
+    args = parser.parse_args()
+
+    L = args.points
+    y = np.sin(np.linspace(0, 200, L)) + np.random.default_rng(0).normal(0, 0.1, L)
+
+    failed = False
+    for d in (1, 2, 3):
+        solvers.penalty_band.cache_clear()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        z = whittaker(y, lmd=1, d=d)
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / 2**20
+        ok = peak_mb <= args.ceiling and np.all(np.isfinite(z))
+        failed = failed or not ok
+        print(f"points = {L}, d = {d}: {elapsed:.3f} s, peak memory {peak_mb:.1f} MB "
+              f"(ceiling {args.ceiling:.0f} MB) {'ok' if ok else 'FAILED'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+'''
+raman_tl - baseline correction, smoothing and processing of Raman spectra
+
+library API, importing the package does not import matplotlib:
+
+    from raman_tl import load_spectrum, process_spectrum, Options
+    freq, intens = load_spectrum('test.txt')
+    result = process_spectrum('test', freq, intens, Options(lam=1000, xmin=400))
+    result.baseline, result.filtered, result.peakz
+
+the command line interface is in raman_tl.cli (python -m raman_tl)
+'''
+
+__version__ = '0.2.0'
+
+from .fileio import load_spectrum, load_spectra, save_dat, spectrum_name, file_spectra
+from .mapio import is_map, load_spc, load_npy_map, load_raw_map, map_spectrum, map_spectra
+from .baseline import baseline_arPLS, baseline_arPLS_batch, arPLS_fit, arPLS_sweep
+from .smoothing import whittaker, savgol, smooth
+from .selection import auto_baseline_lambda, auto_whittaker_lambda
+from .processing import (Options, SpectrumResult, RunResult, apply_offsets, nearest_index,
+                         crop_indices, peak_threshold, detect_peaks, process_spectrum,
+                         finish_spectrum, process_spectra, sweep_spectrum, overlay_curve,
+                         overlay_threshold, aggregate_peaks)
+from .cache import ResultCache, process_file_cached, process_files_cached
+from .parallel import process_file, process_files
+from .stream import stream_spectra, select_spectra, count_spectra
+from .batchfile import BatchWriter, save_batch, load_batch, batch_spectrum
+from .profiling import Profiler, StageRecord, add_hook, remove_hook, stage
+from .render import SpectrumRenderer, render_spectra, select_results
+from .service import serve, SpectrumPool
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+#python -m raman_tl
+from .cli import main
+
+#guard for worker processes of --jobs
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+
+# for arPLS baseline correction, please cite:
+"Baseline correction using asymmetrically reweighted penalized least squares smoothing"
+Sung-June Baek, Aaron Park, Young-Jin Ahna, Jaebum Choo
+Analyst 2015, 140, 250-257
+DOI: https://doi.org/10.1039/C4AN01061B
+
+# python adaption based on the code example from:
+https://stackoverflow.com/questions/29156532/python-baseline-correction-library
+Daniel Casas-Orozco
+
+'''
+
+import numpy as np                                      #for several calculations
+from scipy.special import expit                         #for arPLS
+from .solvers import get_solver, default_solver         #solver backends for arPLS
+from .solvers import solve_banded_batch                 #banded solver for all rows
+
+arpls_ratio = 1e-6                          #ratio for arPLS
+lam = 1000                                  #lamda for the arPLS baseline correction
+n_iter = 200                                #number of iterations for arPLS
+batch_chunk = 2048                          #spectra per arPLS_rows call, limits memory
+
+# arPLS baseline correction
+# solver: 'banded' (banded Cholesky, default) or 'superlu' (reference), see solvers.py
+# info: dict or None, receives the number of iterations and the final crit (profiling)
+def baseline_arPLS(y, ratio=arpls_ratio, lam=lam, niter=n_iter, solver=default_solver, info=None):
+    return arPLS_fit(y, ratio, lam, niter, solver, info=info)[0]
+
+# arPLS baseline correction starting from the weights w (None: all weights 1)
+# returns the baseline, the final weights and the number of iterations
+# the final weights of a similar spectrum or of a neighbouring lambda are a good start (warm start)
+def arPLS_fit(y, ratio=arpls_ratio, lam=lam, niter=n_iter, solver=default_solver, w=None, info=None):
+    y = np.asarray(y, dtype=float)
+    L = len(y)
+    solve = get_solver(solver)
+    w = np.ones(L) if w is None else np.array(w, dtype=float)
+    crit = 1
+    count = 0
+    while crit > ratio:
+        z = solve(w, y, lam)
+        d = y - z
+        dn = d[d < 0]
+        m = np.mean(dn)
+        s = np.std(dn)
+        w_new = expit(-2 * (d - (2*s - m))/s)
+        crit = np.linalg.norm(w_new - w) / np.linalg.norm(w)
+        w = w_new
+        count += 1
+        if count > niter:
+            break
+    if info is not None:
+        info.update(iterations=count, crit=float(crit))
+    return z, w, count
+
+# arPLS baselines of y for every lambda of lams (one row per lambda)
+# warm: every lambda starts from the final weights of the previous one, else from all weights 1
+# returns the baselines and the number of iterations per lambda
+def arPLS_sweep(y, lams, ratio=arpls_ratio, niter=n_iter, solver=default_solver, warm=True):
+    y = np.asarray(y, dtype=float)
+    Z = np.empty((len(lams), len(y)))
+    counts = np.empty(len(lams), dtype=int)
+    w = None
+    for index, lam_ in enumerate(lams):
+        Z[index], w_final, counts[index] = arPLS_fit(y, ratio, lam_, niter, solver, w)
+        if warm:
+            w = w_final
+    return Z, counts
+
+# arPLS baseline correction for many spectra of equal length (e.g. the lambda grid of the V-curve)
+# Y: n_spectra x n_points, returns the baselines as n_spectra x n_points
+# all rows share the penalty band, every row is solved with its own banded Cholesky per iteration,
+# the weights are updated for all rows at once, a row is frozen when its own crit <= ratio
+# same iteration as baseline_arPLS, results match it within rounding, about as fast as
+# one baseline_arPLS per spectrum (the solves dominate), process_spectra solves spectrum by spectrum
+# lam: one lambda for all rows or an array with one lambda per row
+# info: dict or None, receives the lists of iterations and final crit of every row (profiling)
+def baseline_arPLS_batch(Y, ratio=arpls_ratio, lam=lam, niter=n_iter, chunk=batch_chunk, info=None):
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    Z = np.empty_like(Y)
+    for start in range(0, len(Y), chunk):
+        lam_ = lam[start:start + chunk] if np.ndim(lam) else lam
+        Z[start:start + chunk] = arPLS_rows(Y[start:start + chunk], ratio, lam_, niter, info)
+    return Z
+
+#arPLS weights of the residuals d = y - z of every row (n x L)
+#logistic function of the residual, scaled with mean and std of the negative residuals of the row
+def arPLS_weights(d):
+    neg = d < 0
+    nneg = neg.sum(axis=1)
+    m = np.where(neg, d, 0).sum(axis=1) / nneg
+    s = np.sqrt(np.where(neg, (d - m[:, None])**2, 0).sum(axis=1) / nneg)
+    return expit(-2 * (d - (2*s - m)[:, None])/s[:, None])
+
+#arPLS iteration for all rows of Y
+#converged rows are stored in Z and dropped from the working arrays
+#info: dict or None, the iterations and final crit of every row are appended to its lists
+def arPLS_rows(Y, ratio, lam, niter, info=None):
+    n, L = Y.shape
+    Z = np.empty_like(Y)
+    rows = np.arange(n)                     #rows of Y that are not converged yet
+    counts = np.zeros(n, dtype=int)         #iterations of every row
+    crits = np.empty(n)                     #last crit of every row
+    y = Y
+    w = np.ones((n, L))
+    count = 0
+    while True:
+        z = solve_banded_batch(w, y, lam)
+        w_new = arPLS_weights(y - z)
+        crit = np.linalg.norm(w_new - w, axis=1) / np.linalg.norm(w, axis=1)
+        count += 1
+        counts[rows] = count
+        crits[rows] = crit
+        if count > niter:
+            Z[rows] = z
+            break
+        #freeze rows with crit <= ratio (or nan, like baseline_arPLS)
+        going = crit > ratio
+        if not going.all():
+            Z[rows[~going]] = z[~going]
+            if not going.any():
+                break
+            rows, y, w_new = rows[going], y[going], w_new[going]
+            if np.ndim(lam):
+                lam = lam[going]
+        w = w_new
+    if info is not None:
+        info.setdefault('iterations', list()).extend(counts.tolist())
+        info.setdefault('crit', list()).extend(crits.tolist())
+    return Z
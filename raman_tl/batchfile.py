@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+columnar batch file: all spectra of a run in one uncompressed .npz file, full precision
+
+columns (.npy members):
+  names                       name of every spectrum
+  offsets                     spectrum i is freq[offsets[i]:offsets[i + 1]] (same for all point columns)
+  freq, intens, baseline,     wave numbers, raw intensities (with offsets), arPLS baseline,
+  corrected, filtered         baseline corrected and smoothed intensities, concatenated
+  start, stop                 xmin to xmax range of every spectrum (indices into the spectrum)
+  lam, whittaker_lmd          lambdas of every spectrum (nan: not used / None)
+  threshold                   peak detection threshold of every spectrum (nan: None)
+  peak_offsets                peaks of spectrum i are peaks[peak_offsets[i]:peak_offsets[i + 1]]
+  peaks, peak_freq,           peak indices (into the spectrum), wave numbers and
+  peak_height                 smoothed intensities of the peaks
+
+BatchWriter appends the point columns spectrum by spectrum to temporary files, the .npz is
+assembled on close, memory does not grow with the number of spectra (streaming mode)
+load_batch memory-maps the columns (members are stored, not compressed), np.load works as well
+'''
+
+import os                                               #os file processing
+import struct                                           #zip local file header
+import shutil                                           #copy temporary columns
+import tempfile                                         #temporary columns
+import zipfile                                          #.npz container
+import numpy as np                                      #for several calculations
+
+point_columns = ('freq', 'intens', 'baseline', 'corrected', 'filtered')  #one value per point
+spectrum_columns = ('start', 'stop', 'lam', 'whittaker_lmd', 'threshold')   #one value per spectrum
+peak_columns = ('peaks', 'peak_freq', 'peak_height')   #one value per peak
+column_dtypes = {'start': np.int64, 'stop': np.int64, 'peaks': np.int64}    #float64 if not listed
+zip_local_header = struct.Struct('<4s5H3I2H')           #local file header of a zip member
+
+#float of an option, nan for None and non-numbers (e.g. no Whittaker lambda with Savitzky–Golay)
+def option_value(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+#write SpectrumResults into a batch file, use as context manager or call close()
+#an exception in the with block (or discard()) removes the temporary files, no .npz is written
+class BatchWriter:
+    def __init__(self, filename):
+        self.filename = filename
+        self.temp = tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(filename)))
+        #point and peak columns go to temporary files, the rest is small (one value per spectrum)
+        self.files = {name: open(os.path.join(self.temp.name, name), 'wb')
+                      for name in point_columns + peak_columns}
+        self.names = list()
+        self.offsets = [0]
+        self.peak_offsets = [0]
+        self.values = {name: list() for name in spectrum_columns}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    #append one spectrum
+    def write(self, result):
+        options = result.options
+        peaks = result.start + np.asarray(result.peaks, dtype=np.int64)
+        columns = {'freq': result.freq, 'intens': result.intens, 'baseline': result.baseline,
+                   'corrected': result.corrected, 'filtered': result.filtered,
+                   'peaks': peaks, 'peak_freq': result.freq[peaks], 'peak_height': result.filtered[peaks]}
+        for name, column in columns.items():
+            np.ascontiguousarray(column, dtype=column_dtypes.get(name, np.float64)).tofile(self.files[name])
+        self.names.append(result.name)
+        self.offsets.append(self.offsets[-1] + len(result.freq))
+        self.peak_offsets.append(self.peak_offsets[-1] + len(peaks))
+        self.values['start'].append(result.start)
+        self.values['stop'].append(result.stop)
+        self.values['lam'].append(option_value(options.lam if options else None))
+        self.values['whittaker_lmd'].append(option_value(options.whittaker_lmd if options and not options.wp else None))
+        self.values['threshold'].append(option_value(result.threshold))
+
+    #remove the temporary files without writing the .npz file (e.g. after an error)
+    def discard(self):
+        if self.temp is None:
+            return
+        for output_file in self.files.values():
+            output_file.close()
+        self.temp.cleanup()
+        self.temp = None
+
+    #assemble the .npz file (written to a temporary file and renamed)
+    #if this fails, the partial file and the temporary files are removed
+    def close(self):
+        if self.temp is None:
+            return
+        for output_file in self.files.values():
+            output_file.close()
+        partial = self.filename + '.tmp'
+        try:
+            self.assemble(partial)
+            os.replace(partial, self.filename)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        finally:
+            self.discard()
+
+    #write the columns into the zip file partial
+    def assemble(self, partial):
+        with zipfile.ZipFile(partial, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            small = {'names': np.array(self.names, dtype=str),
+                     'offsets': np.array(self.offsets, dtype=np.int64),
+                     'peak_offsets': np.array(self.peak_offsets, dtype=np.int64)}
+            small.update({name: np.array(values, dtype=column_dtypes.get(name, np.float64))
+                          for name, values in self.values.items()})
+            for name, column in small.items():
+                with archive.open(name + '.npy', 'w', force_zip64=True) as member:
+                    np.lib.format.write_array(member, column)
+            for name in point_columns + peak_columns:
+                dtype = np.dtype(column_dtypes.get(name, np.float64))
+                path = os.path.join(self.temp.name, name)
+                header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                          'shape': (os.path.getsize(path) // dtype.itemsize,)}
+                with archive.open(name + '.npy', 'w', force_zip64=True) as member:
+                    np.lib.format.write_array_header_2_0(member, header)
+                    with open(path, 'rb') as column_file:
+                        shutil.copyfileobj(column_file, member, 1 << 20)
+
+#write all spectra of a RunResult (or any iterable of SpectrumResults) into a batch file
+def save_batch(filename, run):
+    with BatchWriter(filename) as writer:
+        for result in run:
+            writer.write(result)
+
+#columns of a batch file as dict name -> array, memory-mapped (mmap_mode, e.g. 'r') or read
+def load_batch(filename, mmap_mode='r'):
+    if mmap_mode is None:
+        with np.load(filename) as data:
+            return {name: data[name] for name in data.files}
+    columns = dict()
+    with open(filename, 'rb') as input_file, zipfile.ZipFile(input_file) as archive:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            #strings are small, compressed members can not be mapped
+            if info.compress_type != zipfile.ZIP_STORED or name == 'names':
+                with archive.open(info) as member:
+                    columns[name] = np.lib.format.read_array(member)
+                continue
+            input_file.seek(info.header_offset)
+            fields = zip_local_header.unpack(input_file.read(zip_local_header.size))
+            input_file.seek(info.header_offset + zip_local_header.size + fields[-2] + fields[-1])
+            version = np.lib.format.read_magic(input_file)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) \
+                else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(input_file)
+            if not shape or 0 in shape:
+                columns[name] = np.zeros(shape, dtype=dtype)
+                continue
+            columns[name] = np.memmap(filename, dtype=dtype, mode=mmap_mode, shape=shape,
+                                      order='F' if fortran_order else 'C', offset=input_file.tell())
+    return columns
+
+#columns of spectrum index of a batch (load_batch) as dict name -> array (views, no copies)
+def batch_spectrum(batch, index):
+    points = slice(batch['offsets'][index], batch['offsets'][index + 1])
+    peaks = slice(batch['peak_offsets'][index], batch['peak_offsets'][index + 1])
+    spectrum = {'name': str(batch['names'][index])}
+    spectrum.update({name: batch[name][points] for name in point_columns})
+    spectrum.update({name: batch[name][index] for name in spectrum_columns})
+    spectrum.update({name: batch[name][peaks] for name in peak_columns})
+    return spectrum
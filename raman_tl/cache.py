@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+persistent on-disk cache of processed spectra
+
+the cache is content addressed, the key is a sha256 hash of the file bytes,
+the options that change the arrays (lambda, solver, Whittaker lambda, Savitzky–Golay
+parameters, multiply, add, intensities, numbers as float: 1000 and 1000.0 are the same key)
+and a hash of the processing code (code_hash), a changed solver or filter invalidates the entries
+xmin, xmax and threshold are not part of the key: a re-run with other display options
+reads the arrays from the cache and only crops and detects the peaks again
+map files (SPC, NPY) are memory-mapped and processed without the cache
+
+one .npz file per spectrum (freq, intens, baseline, corrected, filtered and the lambdas),
+the least recently used files are removed if the cache is larger than the size limit,
+temporary files of interrupted writes are removed after stale_temp seconds
+'''
+
+import os                                               #os file processing
+import io                                               #parse cached file bytes
+import time                                             #age of temporary files
+import hashlib                                          #content hash
+from functools import lru_cache                         #code hash of the process
+import zipfile                                          #broken .npz files
+from dataclasses import replace                         #options with the cached lambdas
+import numpy as np                                      #for several calculations
+from . import __version__                               #code version, if the sources can not be read
+from .fileio import load_spectrum, spectrum_name        #read spectra
+from .mapio import is_map, map_spectra                  #memory-mapped map files
+from .processing import RunResult, process_spectrum     #processing pipeline
+from .processing import finish_spectrum, process_spectra    #display stage, processing of several spectra
+from .selection import auto                             #automatic lambda selection
+
+default_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'raman_tl')   #default cache directory
+default_cache_size = 1024                   #size limit of the cache in MB
+cache_options = ('lam', 'solver', 'whittaker_lmd', 'wp', 'multiply', 'add', 'intensities')  #options in the key
+cache_arrays = ('freq', 'intens', 'baseline', 'corrected', 'filtered')  #arrays stored per spectrum
+cache_lambdas = ('lam', 'whittaker_lmd')    #lambdas stored per spectrum, selected if 'auto'
+cache_sources = ('fileio.py', 'mapio.py', 'solvers.py', 'baseline.py', 'smoothing.py', 'selection.py',
+                 'processing.py', 'cache.py')   #modules that change the cached arrays, part of the key
+stale_temp = 3600                           #age in seconds of temporary files removed by evict
+
+#sha256 of the sources of cache_sources, the version if they can not be read (e.g. frozen app)
+@lru_cache(maxsize=None)
+def code_hash():
+    code = hashlib.sha256()
+    try:
+        for source in cache_sources:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), source), 'rb') as source_file:
+                code.update(source_file.read())
+    except OSError:
+        return __version__
+    return code.hexdigest()
+
+#option value of the key, numbers as float (lam 1000 and 1000.0 give the same arrays)
+def key_value(value):
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (tuple, list)):
+        return tuple(key_value(item) for item in value)
+    return value
+
+#cache directory with size limit (MB) and LRU eviction
+#a hit refreshes the modification time of the file, eviction removes the oldest files first
+#several processes can share the cache, files are written to a temporary file and renamed
+class ResultCache:
+    def __init__(self, folder=default_cache_dir, size=default_cache_size):
+        self.folder = folder
+        self.max_bytes = int(size * 1024**2)
+        os.makedirs(folder, exist_ok=True)
+
+    #key of the file content data (bytes) processed with options
+    def key(self, data, options):
+        content = hashlib.sha256(data)
+        content.update(repr((code_hash(),) + tuple(key_value(getattr(options, name))
+                                                   for name in cache_options)).encode())
+        return content.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.folder, key + '.npz')
+
+    #cached arrays (dict name -> array) and lambdas (dict name -> float, nan if None) or None
+    def load(self, key):
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in cache_arrays + cache_lambdas}
+            #least recently used: the modification time is the time of the last hit
+            os.utime(path)
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+        return arrays
+
+    #store the arrays of a SpectrumResult, a full disk or a read-only cache only prints a warning
+    def save(self, key, result):
+        path = self.path(key)
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp, 'wb') as output_file:
+                np.savez(output_file, **{name: getattr(result, name) for name in cache_arrays},
+                         **{name: np.nan if getattr(result.options, name) is None else getattr(result.options, name)
+                            for name in cache_lambdas})
+            os.replace(temp, path)
+        except OSError as error:
+            print(f"Warning! '{result.name}' could not be cached: {error}")
+
+    #remove least recently used files until the cache is not larger than max_bytes
+    #and temporary files older than stale_temp seconds (interrupted writes)
+    def evict(self):
+        entries = list()
+        now = time.time()
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith('.tmp'):
+                try:
+                    if now - entry.stat().st_mtime > stale_temp:
+                        os.remove(entry.path)
+                #written or removed by another process
+                except OSError:
+                    pass
+            elif entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            #already removed by another process
+            except OSError:
+                pass
+            total -= size
+
+#display stage of cached arrays, 'auto' lambdas of options are replaced by the cached ones
+def finish_cached(name, arrays, options):
+    for lambda_name in cache_lambdas:
+        value = arrays.pop(lambda_name).item()
+        if getattr(options, lambda_name) == auto:
+            options = replace(options, **{lambda_name: value})
+    return finish_spectrum(name, options=options, **arrays)
+
+#load and process one file with the cache, a hit only runs the display stage
+#raises IOError (OSError) if the file can not be opened
+def process_file_cached(filename, options, cache):
+    with open(filename, 'rb') as input_file:
+        data = input_file.read()
+    key = cache.key(data, options)
+    arrays = cache.load(key)
+    if arrays is not None:
+        return finish_cached(spectrum_name(filename), arrays, options)
+    freq, intens = load_spectrum(io.BytesIO(data))
+    result = process_spectrum(spectrum_name(filename), freq, intens, options)
+    cache.save(key, result)
+    return result
+
+#load and process files with the cache, spectra that are not cached are processed
+#with process_spectra ('auto' lambdas selected together), returns the RunResult (input order)
+#raises IOError (OSError) if a file can not be opened
+def process_files_cached(filenames, options, cache):
+    run = RunResult(options)
+    freqdict=dict()                         #frequencies of the spectra not in the cache
+    intensdict=dict()                       #intensities of the spectra not in the cache
+    keys = dict()                           #name -> key of the spectra not in the cache
+    for filename in filenames:
+        if is_map(filename):
+            for name, freq, intens in map_spectra(filename):
+                run.spectra[name] = None
+                freqdict[name], intensdict[name] = freq, intens
+            continue
+        name = spectrum_name(filename)
+        with open(filename, 'rb') as input_file:
+            data = input_file.read()
+        key = cache.key(data, options)
+        arrays = cache.load(key)
+        if arrays is None:
+            #keep the input order, the result follows below
+            run.spectra[name] = None
+            freqdict[name], intensdict[name] = load_spectrum(io.BytesIO(data))
+            keys[name] = key
+        else:
+            run.spectra[name] = finish_cached(name, arrays, options)
+    for name, result in process_spectra(freqdict, intensdict, options).spectra.items():
+        run.spectra[name] = result
+        if name in keys:
+            cache.save(keys[name], result)
+    cache.evict()
+    return run
@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+command line interface of raman-tl
+
+usage: python -m raman_tl file1.txt file2.txt [options]
+       python raman_tl/raman-tl.py file1.txt file2.txt [options]
+
+matplotlib is only imported if summary.pdf, PNGs or the summary plot are requested,
+data only runs (-n -s d) do not load it
+
+# open more than one datat set under windows:
+open powershell: baseline.py (Get-ChildItem *.txt -Name)
+'''
+
+import sys                                              #sys
+import os                                               #os file processing
+import argparse                                         #argument parser
+import numpy as np                                      #for several calculations
+from .fileio import load_spectra, save_dat              #read spectra, save data
+from .fileio import dat_delimiter, dat_precision        #data export defaults
+from .processing import Options, process_spectra        #processing pipeline
+from .parallel import process_files                     #process pool
+from .cache import ResultCache, process_files_cached    #on-disk cache
+from .cache import default_cache_dir, default_cache_size    #cache defaults
+from .processing import RunResult                       #results of the streaming mode
+from .processing import sweep_spectrum                  #lambda sweep
+from .fileio import file_spectra                        #read spectra of the lambda sweep
+from .stream import stream_spectra, select_spectra, stream_chunk    #streaming mode
+from .stream import count_spectra                       #spectra of text and map files
+from .mapio import map_collisions                       #map files with the name of another file
+from .watch import watch, watch_pattern                 #watch folder
+from .service import serve                              #HTTP processing service
+from .batchfile import BatchWriter, save_batch          #columnar batch file
+from .smoothing import parse_wp                         #Savitzky–Golay parameters
+from .solvers import solvers, default_solver            #solver backends for arPLS
+from .selection import auto                             #automatic lambda selection
+from .profiling import Profiler, stage                  #per stage timing
+from .render import SpectrumRenderer, render_spectra, select_results   #single spectrum figures
+
+#type of -l and -w: a number or 'auto' (V-curve, see selection.py)
+def lambda_type(type_):
+    def convert(text):
+        return auto if text == auto else type_(text)
+    #name in the error message of argparse
+    convert.__name__ = type_.__name__
+    return convert
+
+#argument parser
+def build_parser():
+    parser = argparse.ArgumentParser(prog='raman-tl',
+             description='Baseline correction, smoothing and processing of Raman spectra',
+             formatter_class=argparse.RawTextHelpFormatter)
+
+    #filename is required
+    parser.add_argument("filename",
+        nargs="*",
+        help="filename(s), data - data format is: frequency [space] intensity\n"
+             "map files with several spectra: .spc (SPC), .npy (first row frequencies, one row per spectrum)")
+
+    #lambda for baseline
+    parser.add_argument('-l','--lambda',
+        type=lambda_type(int),
+        dest='lambda_',
+        metavar='LAMBDA',
+        default=1000,
+        help='lambda for arPLS (baseline) correction\n' +
+             'save values start from 1000, '+
+             'values less than 1000 giver sharper peaks,\n' +
+             'but broader peaks will become part of the baseline\n' +
+             'check output\n' +
+             'auto: select lambda per spectrum with the V-curve')
+
+    #solver backend for arPLS
+    parser.add_argument('--solver',
+        choices=list(solvers),
+        default=default_solver,
+        help='solver backend for arPLS (baseline) correction\n' +
+             'banded: banded Cholesky (fast, default)\n' +
+             'superlu: sparse LU (reference)')
+
+    #parameter for Savitzky–Golay filter
+    parser.add_argument('-p','--wp',
+        type=str,
+        metavar=('WINDOWLENGTH : POLYORDER'),
+        help='activates the Savitzky–Golay filter (smoothing)\n'+
+             'window length and polynomial order for the Savitzky–Golay filter (smoothing)\n'+
+             'window length must be a positive odd number and ' +
+             'window length > polynomial order')
+
+    #parameter for Whittaker filter
+    parser.add_argument('-w','--whittaker',
+        type=lambda_type(float),
+        default=1,
+        help='lamda parameter for the Whittaker  filter (smoothing)\n' +
+             'auto: select lambda per spectrum with the V-curve')
+
+    #start spectra at xmin
+    parser.add_argument('-xmin','--xmin',
+        type=float,
+        help='start spectra at xmin wave numbers\n'+
+             'take care of the collected data range\n' +
+             'xmax must be greater than xmin and xmin and xmax ' +
+             'should not be equal or to close together')
+
+    #end spectra at xmax
+    parser.add_argument('-xmax','--xmax',
+        type=float,
+        help='end spectra at xmax wave numbers\n'+
+             'take care of the collected data range\n' +
+             'xmax must be greater than xmin and xmin and xmax ' +
+             'should not be equal or to close together')
+
+    #threshold for peak annotation
+    parser.add_argument('-t','--threshold',
+        type=int,
+        help='threshold for peak detection\n'+
+             'only peaks with intensities equal or above t will be printed')
+
+    #multiply intensities
+    parser.add_argument('-m','--multiply',
+        type=float,
+        help='multiply intensities with m')
+
+    #add to wave numbers
+    parser.add_argument('-a','--add',
+        type=float,
+        help='add or subtract a to wave numbers\n' +
+             'take care of the collected data range ' +
+             'and -xmin and -xmax options')
+
+    #add to intensities
+    parser.add_argument('-i','--intensities',
+        type=float,
+        default = 0,
+        help='add or subtract i to intensities\n' +
+        'take care of peak detection')
+
+    #overlay spectra
+    parser.add_argument('-o','--overlay',
+        default=0, action='store_true',
+        help='plot (normalized) overlay and normalized stacked spectra')
+
+    #do not save the pdf
+    parser.add_argument('-n','--nosave',
+        default=1, action='store_false',
+        help='do not save summary.pdf')
+
+    #save spectra and / or modified data
+    parser.add_argument('-s','--save',
+        type=str,
+        metavar=('p[ng], d[at]'),
+        help='save PNG and DAT files of every spectra including summary.png\n'+
+             'DAT data are baseline corrected and filtered\n' +
+             'xmin and xmax are active')
+    parser.add_argument('-od','--output_dir',type=str,help='output directory')
+
+    #format of the DAT data
+    parser.add_argument('--precision',
+        type=str,
+        default=f'{dat_precision[0]}:{dat_precision[1]}',
+        metavar='WN:INT',
+        help='decimals of wave numbers and intensities in the DAT data (default: %(default)s)')
+    parser.add_argument('--delimiter',
+        type=str,
+        default=dat_delimiter,
+        help='separator in the DAT data (default: %(default)s)')
+    parser.add_argument('--atomic',
+        default=False, action='store_true',
+        help='write the DAT data to a temporary file and rename it when complete\n' +
+             '(always on with --watch)')
+
+    #columnar batch file
+    parser.add_argument('-b','--batch',
+        type=str,
+        metavar='FILE',
+        help='save all spectra (raw, baseline, corrected, smoothed, peaks) in one\n' +
+             '.npz batch file in the output directory, full precision, can be memory-mapped')
+    parser.add_argument('-ss','--show_summary',default=False,action='store_true',help='show summary plot')
+
+    #summary pages and heat map
+    parser.add_argument('--summary_page',
+        type=int,
+        metavar='N',
+        help='N spectra per page of the summary plot (default: 8),\n' +
+             'several pages: summary-1.png, summary-2.png, ...')
+    parser.add_argument('--heatmap',
+        default=False, action='store_true',
+        help='heat map of all smoothed spectra to heatmap.png and summary.pdf')
+
+    #single spectrum figures
+    parser.add_argument('--plot_budget',
+        type=int,
+        metavar='N',
+        help='at most N single spectrum figures (PDF pages and PNGs), evenly spaced\n' +
+             'over the spectra matching --plot_select')
+    parser.add_argument('--plot_select',
+        type=str,
+        metavar='PATTERN',
+        help="single spectrum figures only for spectra with names matching PATTERN, e.g. 'sample*'")
+    parser.add_argument('--render_jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='render the PNGs of the single spectra in N worker processes, 0: all cores '
+             '(PNGs only, with summary.pdf every figure is rendered once in the main process)')
+
+    #per stage timing
+    parser.add_argument('--profile',
+        type=str,
+        metavar='FILE',
+        help='record wall time and arPLS iterations / crit of every stage\n' +
+             '(load, baseline, smooth, peaks, export, plot, pdf, png, ...) and spectrum,\n' +
+             'print a summary and save the report to FILE (.json or .csv)')
+    parser.add_argument('--profile_memory',
+        default=False, action='store_true',
+        help='--profile records the peak memory of every stage as well (tracemalloc, slower)')
+
+    #number of worker processes
+    parser.add_argument('-j','--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='process the files in N worker processes, 0: all cores\n' +
+             'files that can not be processed are reported and skipped')
+
+    #on-disk cache of baseline corrected and smoothed spectra
+    parser.add_argument('--cache',
+        nargs='?',
+        const=default_cache_dir,
+        metavar='DIR',
+        help='cache baseline corrected and smoothed spectra in DIR\n' +
+             f'(default: {default_cache_dir})\n' +
+             're-runs with other -xmin, -xmax or -t options read the cache')
+    parser.add_argument('--cache_size',
+        type=float,
+        default=default_cache_size,
+        metavar='MB',
+        help='size limit of the cache in MB, least recently used spectra are removed\n' +
+             f'(default: {default_cache_size})')
+
+    #streaming mode for large batches
+    parser.add_argument('--stream',
+        nargs='?',
+        type=int,
+        const=stream_chunk,
+        metavar='CHUNK',
+        help='streaming mode, process, export and release CHUNK spectra at a time\n' +
+             f'(default: {stream_chunk}), memory does not grow with the number of files\n' +
+             'summary, overlay and stacked plots show a selection of the spectra')
+
+    #watch folder
+    parser.add_argument('--watch',
+        metavar='DIR',
+        help='watch DIR and process new spectra as soon as they are written\n' +
+             'every spectrum is saved as -mod.csv immediately (no plots), Ctrl+C to stop\n' +
+             'worker processes: -j (0: all cores)')
+    parser.add_argument('--pattern',
+        default=watch_pattern,
+        help=f'file name pattern of new spectra in the watch folder (default: {watch_pattern})')
+
+    #HTTP processing service
+    parser.add_argument('--serve',
+        metavar='[HOST:]PORT',
+        help='start a local HTTP / WebSocket processing service on PORT (host: 127.0.0.1)\n' +
+             'POST /process (text file uploads or JSON arrays), GET /ws, GET /health\n' +
+             'the processing options are the defaults of the requests,\n' +
+             'worker processes: -j (0: all cores), Ctrl+C to stop')
+
+    #lambda sweep
+    parser.add_argument('--sweep',
+        type=str,
+        metavar='LAMBDAS',
+        help='arPLS (baseline) correction for every lambda of a comma separated list, e.g. 1e2,1e3,1e4\n' +
+             'every lambda starts from the weights of the previous one (warm start),\n' +
+             'prints the iterations per lambda, -s d saves name-lLAMBDA-mod.csv (no plots)')
+    return parser
+
+#processing options from parsed arguments
+def options_from_args(args):
+    return Options(lam=args.lambda_,
+                   solver=args.solver,
+                   whittaker_lmd=args.whittaker,
+                   wp=parse_wp(args.wp) if args.wp else None,
+                   xmin=args.xmin,
+                   xmax=args.xmax,
+                   threshold=args.threshold,
+                   multiply=args.multiply,
+                   add=args.add,
+                   intensities=args.intensities)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.profile:
+        run_main(parser, args, argv)
+        return
+
+    #per stage timing, the report is written even if the run exits early
+    if args.jobs != 1:
+        print("Warning! Only this process is profiled, the stages in the -j worker processes are not recorded.")
+    try:
+        with Profiler(args.profile_memory) as profiler:
+            run_main(parser, args, argv)
+    finally:
+        profiler.print_summary()
+        try:
+            profiler.save(args.profile)
+        except IOError:
+            print("Write error. Profile not saved.")
+
+def run_main(parser, args, argv=None):
+    if not args.filename and not args.watch and not args.serve:
+        parser.error('the following arguments are required: filename')
+    #spectra of a map file are named FILE-INDEX, a second file with the same name would overwrite them
+    collisions = map_collisions(args.filename)
+    if collisions:
+        parser.error(f"map files with the same name as another input file: {', '.join(collisions)} (rename them)")
+    options = options_from_args(args)
+
+    file_output_path=args.output_dir
+    if file_output_path is None:
+        file_output_path = os.getcwd()
+
+    #format of the DAT data, keyword arguments of save_dat
+    #precision: exactly two non-negative numbers of decimals (WN:INT)
+    try:
+        precision = tuple(int(value) for value in args.precision.split(':'))
+    except ValueError:
+        precision = ()
+    if len(precision) != 2 or min(precision) < 0:
+        parser.error(f"argument --precision: invalid value: '{args.precision}' (expected WN:INT, e.g. 3:2)")
+    dat_format = {'delimiter': args.delimiter, 'precision': precision, 'atomic': args.atomic}
+
+    #check for p or P (png) or d or D (dat) in argument
+    #save PNGs and DAT data if True
+    save_plots_png = bool(args.save) and ("p" in args.save or "P" in args.save)
+    save_dat_files = bool(args.save) and ("d" in args.save or "D" in args.save)
+    #if True save summary.pdf
+    save_pdf = args.nosave
+    #show overlay and stacked spectra
+    overlay = args.overlay
+
+    if args.render_jobs != 1 and save_pdf and save_plots_png:
+        print("Warning! '--render_jobs' is only used without summary.pdf, the figures are rendered in this process.")
+
+    if options.add:
+        print("Warning! The '-a' option can change your results completely. Use it with extra care.")
+
+    cache = ResultCache(args.cache, args.cache_size) if args.cache else None
+
+    #instructions for the plots
+    command_line = sys.argv if argv is None else [parser.prog] + list(argv)
+    command_line = str(command_line).replace(","," ").replace("'","").replace("[", "").replace("]","")
+
+    if args.serve:
+        try:
+            serve(args.serve, options, args.jobs)
+        except ValueError:
+            parser.error(f"argument --serve: invalid address: '{args.serve}'")
+        except OSError as error:
+            print(f"Service could not be started: {error}")
+        return
+
+    if args.watch:
+        watch(args.watch, options, file_output_path, args.pattern, args.jobs, cache,
+              dat_format=dict(dat_format, atomic=True))
+        return
+
+    if args.sweep:
+        try:
+            lams = [float(lam_) for lam_ in args.sweep.split(',')]
+        except ValueError:
+            parser.error(f"argument --sweep: invalid list of lambdas: '{args.sweep}'")
+        sweep_files(args.filename, lams, options, file_output_path, save_dat_files, dat_format)
+        return
+
+    if args.stream:
+        failed = stream_files(args.filename, options, file_output_path, command_line, save_pdf=save_pdf,
+                              save_plots_png=save_plots_png, save_dat_files=save_dat_files,
+                              show_summary=args.show_summary, overlay=overlay, chunk=args.stream, cache=cache,
+                              batch=args.batch, dat_format=dat_format, plot_budget=args.plot_budget,
+                              plot_select=args.plot_select, render_jobs=args.render_jobs,
+                              summary_page=args.summary_page, heatmap=args.heatmap)
+        for filename, error in failed:
+            print(f"Warning! '{filename}' could not be processed: {error}")
+        return
+
+    if args.jobs == 1:
+        #open one or more files
+        #check existence
+        try:
+            if cache is None:
+                freqdict, intensdict = load_spectra(args.filename)
+            else:
+                #processing stage with the cache, only new spectra or options are calculated
+                run = process_files_cached(args.filename, options, cache)
+        #file not found -> exit here
+        except IOError:
+            print(f"'{args.filename}'" + " not found")
+            sys.exit(1)
+
+        #processing stage, baseline, smoothing and peaks are calculated once per spectrum
+        if cache is None:
+            run = process_spectra(freqdict, intensdict, options)
+    else:
+        #processing stage in worker processes, failed files are skipped
+        run, failed = process_files(args.filename, options, args.jobs, cache)
+        for filename, error in failed:
+            print(f"Warning! '{filename}' could not be processed: {error}")
+        if not len(run):
+            print("No spectrum could be processed. Exit.")
+            sys.exit(1)
+
+    #save modified spectra as "csv"
+    if save_dat_files:
+        export_data(run, file_output_path, dat_format)
+    #save all spectra in one batch file
+    if args.batch:
+        export_batch(run, os.path.join(file_output_path, args.batch))
+
+    #data only (no summary.pdf, no PNGs, no summary plot): matplotlib is never imported
+    if save_pdf or save_plots_png or args.show_summary or args.heatmap:
+        save_plots(run, file_output_path, command_line, save_pdf=save_pdf, save_plots_png=save_plots_png,
+                   show_summary=args.show_summary, overlay=overlay, plot_budget=args.plot_budget,
+                   plot_select=args.plot_select, render_jobs=args.render_jobs,
+                   summary_page=args.summary_page, heatmap=args.heatmap)
+
+#save modified spectra (xmin to xmax, baseline corrected and smoothed) as "csv"
+#dat_format: keyword arguments of save_dat (delimiter, precision, atomic)
+def export_data(run, file_output_path, dat_format=None):
+    for result in run:
+        try:
+            with stage('export', result.name):
+                save_dat(file_output_path+"/"+result.name + "-mod.csv",
+                         result.freq[result.crop], result.filtered[result.crop], **(dat_format or {}))
+        #file not found -> exit here
+        except IOError:
+            print("Write error. Exit.")
+            sys.exit(1)
+
+#save all spectra (raw, baseline, corrected, smoothed, peaks) in one batch file
+def export_batch(run, filename):
+    try:
+        save_batch(filename, run)
+    #file not found -> exit here
+    except IOError:
+        print("Write error. Exit.")
+        sys.exit(1)
+
+#lambda sweep of every file, prints the arPLS iterations per lambda, saves name-lLAMBDA-mod.csv
+def sweep_files(filenames, lams, options, file_output_path, save_dat_files=False, dat_format=None):
+    for filename in filenames:
+        try:
+            spectra = list(file_spectra(filename))
+        #file not found -> exit here
+        except IOError:
+            print(f"'{filename}'" + " not found")
+            sys.exit(1)
+        for name, freq, intens in spectra:
+            results, counts = sweep_spectrum(name, freq, intens, lams, options)
+            print(name + ": " +
+                  ", ".join(f"lambda {lam_:g}: {count}" for lam_, count in zip(lams, counts)) +
+                  f" ({sum(counts)} iterations)")
+            if save_dat_files:
+                for lam_, result in zip(lams, results):
+                    result.name = f"{result.name}-l{lam_:g}"
+                export_data(results, file_output_path, dat_format)
+
+#summary, single spectra, overlay and stacked plots to summary.pdf and / or PNGs
+#plot_budget, plot_select: single spectrum figures of a selection only (render.select_results)
+#render_jobs: worker processes for the single spectrum PNGs without summary.pdf (render.SpectrumRenderer)
+#summary_page: spectra per page of the summary (None: plotting.summary_page), heatmap: heat map of all spectra
+def save_plots(run, file_output_path, command_line='', save_pdf=True, save_plots_png=False,
+               show_summary=False, overlay=False, plot_budget=None, plot_select=None, render_jobs=1,
+               summary_page=None, heatmap=False):
+    #matplotlib is imported only if plots are requested
+    from matplotlib.backends.backend_pdf import PdfPages
+    from . import plotting
+
+    #if True save summary.pdf
+    pdf = PdfPages(os.path.join(file_output_path, "summary.pdf")) if save_pdf else None
+
+    #summary (not with the heat map only)
+    if save_pdf or save_plots_png or show_summary:
+        save_summary(run, file_output_path, command_line, pdf, save_plots_png, show_summary, summary_page)
+
+    #single spectra
+    if save_pdf or save_plots_png:
+        render_spectra(select_results(run, plot_budget, plot_select), run.options, file_output_path,
+                       pdf, save_plots_png, render_jobs)
+
+    #overlay, overlay normalized and stacked spectra
+    if overlay and (save_pdf or save_plots_png):
+        save_overlays(run, pdf, save_plots_png)
+
+    #heat map of all spectra
+    grid = plotting.heatmap_grid(run) if heatmap else None
+    if grid is not None:
+        save_heatmap([plotting.heatmap_row(result, grid) for result in run], grid,
+                     list(run.spectra.keys()), file_output_path, pdf)
+
+    #close summary.pdf
+    if save_pdf:
+        pdf.close()
+
+#summary plot to pdf (PdfPages or None) and / or summary.png, show it if show_summary
+#per_page spectra per page (None: plotting.summary_page), every page is written and closed before the next,
+#several pages: summary-1.png, summary-2.png, ..., show_summary shows the first page
+def save_summary(run, file_output_path, command_line='', pdf=None, save_plots_png=False, show_summary=False,
+                 per_page=None):
+    import matplotlib.pyplot as plt
+    from . import plotting
+
+    pages = plotting.summary_pages(run, per_page or plotting.summary_page)
+    for number, page in enumerate(pages, 1):
+        label = f"page {number} / {len(pages)}" if len(pages) > 1 else None
+        with stage('summary', f"page {number}", spectra=len(page)):
+            fig = plotting.plot_summary(page, command_line, label)
+
+        #save to pdf
+        if pdf is not None:
+            with stage('pdf', f"summary page {number}"):
+                pdf.savefig(fig)
+        #save to png
+        if save_plots_png:
+            png = 'summary.png' if len(pages) == 1 else f"summary-{number}.png"
+            with stage('png', f"summary page {number}"):
+                fig.savefig(os.path.join(file_output_path, png), dpi=plotting.figure_dpi)
+        #free the page, the first one stays open to be shown
+        if not (show_summary and number == 1):
+            plt.close(fig)
+
+    #show the summary plot
+    if show_summary:
+        plt.show()
+    plt.close('all')
+
+#heat map of all spectra to pdf (PdfPages or None) and heatmap.png
+#rows: plotting.heatmap_row of every spectrum on grid, names: names of the spectra
+def save_heatmap(rows, grid, names, file_output_path, pdf=None):
+    import matplotlib.pyplot as plt
+    from . import plotting
+
+    with stage('heatmap', spectra=len(rows)):
+        fig = plotting.plot_heatmap(rows, grid, names)
+        fig.savefig(os.path.join(file_output_path, 'heatmap.png'), dpi=plotting.figure_dpi)
+    if pdf is not None:
+        with stage('pdf', 'heatmap'):
+            pdf.savefig(fig)
+    plt.close(fig)
+
+#overlay, overlay normalized and stacked spectra to pdf (PdfPages or None) and / or PNGs
+def save_overlays(run, pdf=None, save_plots_png=False):
+    import matplotlib.pyplot as plt
+    from . import plotting
+
+    for plot, png in ((plotting.plot_overlay, "overlay.png"),
+                      (plotting.plot_overlay_normalized, "overlay-normalized.png"),
+                      (plotting.plot_stacked, "stacked-normalized.png")):
+        with stage('overlays', png, spectra=len(run)):
+            fig = plot(run)
+        #save plot png
+        if save_plots_png:
+            with stage('png', png):
+                fig.savefig(png, dpi=plotting.figure_dpi)
+        #save plot pdf
+        if pdf is not None:
+            with stage('pdf', png):
+                pdf.savefig(fig)
+        plt.close(fig)
+
+#streaming mode: every spectrum is exported and plotted as soon as its chunk is processed
+#and released, summary, overlay and stacked plots show a selection of the spectra (stream.select_spectra)
+#and are written at the end, the summary is the last page of summary.pdf
+#returns the list of (filename, exception) of the files that could not be loaded
+#batch: file name of the batch file (in file_output_path) or None, written spectrum by spectrum
+#plot_budget: at most plot_budget evenly spaced single spectrum figures (of the spectra matching plot_select),
+#plot_select: only spectra with matching names, render_jobs, summary_page: see save_plots
+#heatmap: heat map of all spectra, one row (heatmap_points float32 values) is kept per spectrum
+def stream_files(filenames, options, file_output_path, command_line='', save_pdf=True, save_plots_png=False,
+                 save_dat_files=False, show_summary=False, overlay=False, chunk=stream_chunk, cache=None,
+                 batch=None, dat_format=None, plot_budget=None, plot_select=None, render_jobs=1,
+                 summary_page=None, heatmap=False):
+    plots = save_pdf or save_plots_png or show_summary
+    if plots or heatmap:
+        from matplotlib.backends.backend_pdf import PdfPages
+        from . import plotting
+    pdf = PdfPages(os.path.join(file_output_path, "summary.pdf")) if save_pdf else None
+    grid = None                             #wave numbers of the heat map, from the first spectrum
+    rows = list()                           #heat map rows, None before the grid is known
+    names = list()                          #names of the heat map rows
+
+    #spectra, not files: a map file has several
+    count = count_spectra(filenames)
+    #single spectrum figures as render.select_results: names matching plot_select first, then the budget
+    matching = count_spectra(filenames, plot_select)
+
+    failed = list()
+    counted = 0                             #failed files already subtracted from count
+
+    #selections over the spectra that arrive, recomputed when a file fails to load
+    #(its spectra are not counted any more, the following positions are selected from the new count)
+    def selections():
+        nonlocal count, matching, counted
+        lost = [failed_name for failed_name, _ in failed[counted:]]
+        count -= count_spectra(lost)
+        matching -= count_spectra(lost, plot_select)
+        counted = len(failed)
+        return (set(select_spectra(count)),
+                None if plot_budget is None else set(select_spectra(matching, plot_budget)))
+
+    keep, plotted = selections()
+    matched = 0                             #number of processed spectra matching plot_select
+    kept = RunResult(options)               #selected spectra for summary and overlay plots
+    streamed = 0                            #number of processed spectra
+    writer = BatchWriter(os.path.join(file_output_path, batch)) if batch else None
+    renderer = SpectrumRenderer(options, file_output_path, pdf, save_plots_png, render_jobs) \
+        if save_pdf or save_plots_png else None
+    last = None                             #last result and whether its figure was rendered
+    rendered = False
+    #an error (or a write error exit) removes the temporary columns, no partial batch file is left
+    try:
+        for filename, result in stream_spectra(filenames, options, chunk, failed, cache):
+            if counted < len(failed):
+                keep, plotted = selections()
+            if save_dat_files:
+                export_data([result], file_output_path, dat_format)
+            if writer is not None:
+                writer.write(result)
+            last, rendered = result, False
+            if select_results([result], pattern=plot_select):
+                if renderer is not None and (plotted is None or matched in plotted):
+                    renderer.render(result)
+                    rendered = True
+                matched += 1
+            if streamed in keep:
+                kept.spectra[result.name] = result
+            if heatmap:
+                grid = plotting.heatmap_grid([result]) if grid is None else grid
+                rows.append(None if grid is None else plotting.heatmap_row(result, grid))
+                names.append(result.name)
+            streamed += 1
+
+        #files that failed after the last spectrum: the last spectrum is selected like the last of count
+        if counted < len(failed) and last is not None:
+            keep, plotted = selections()
+            if streamed - 1 in keep:
+                kept.spectra[last.name] = last
+            if renderer is not None and not rendered and plotted is not None and matched - 1 in plotted \
+                    and select_results([last], pattern=plot_select):
+                renderer.render(last)
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+
+    if writer is not None:
+        writer.close()
+    if renderer is not None:
+        renderer.close()
+
+    if plots and len(kept) < streamed:
+        print(f"summary and overlay plots show {len(kept)} of {streamed} spectra")
+    if plots and len(kept):
+        save_summary(kept, file_output_path, command_line, pdf, save_plots_png, show_summary, summary_page)
+        if overlay and (save_pdf or save_plots_png):
+            save_overlays(kept, pdf, save_plots_png)
+    if grid is not None:
+        rows = [np.full(len(grid), np.nan, dtype=np.float32) if row is None else row for row in rows]
+        save_heatmap(rows, grid, names, file_output_path, pdf)
+    if save_pdf:
+        pdf.close()
+    return failed
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+reading spectra and writing processed data
+
+input data format is: frequency [space or tab] intensity, one point per line
+map files (SPC, NPY) with several spectra are read memory-mapped, see mapio
+'''
+
+import os                                               #os file processing
+import warnings                                         #parser warnings
+import numpy as np                                      #for several calculations
+from .mapio import is_map, map_spectra                  #memory-mapped map files
+from .profiling import stage                            #per stage timing
+
+dat_delimiter = ","                         #separator character for data export - "csv"
+dat_precision = (3, 2)                      #decimals of wave numbers and intensities for data export
+write_block = 65536                         #lines formatted at once for data export
+
+#name of a spectrum is the file name without path and extension
+def spectrum_name(filename):
+    return os.path.splitext(os.path.basename(filename))[0]
+
+#read one spectrum (file name or binary file object), returns frequencies and intensities as float64 arrays
+#the whole file is parsed in one pass by the C parser of np.loadtxt (first two columns)
+#raises IOError (OSError) if the file can not be opened, ValueError for invalid data
+def load_spectrum(filename):
+    with stage('load', spectrum_name(filename) if isinstance(filename, str) else ''), warnings.catch_warnings():
+        #empty file, same as before: no data points
+        warnings.filterwarnings('ignore', 'loadtxt: input contained no data')
+        data = np.loadtxt(filename, dtype=np.float64, usecols=(0, 1), ndmin=2)
+    return np.ascontiguousarray(data[:, 0]), np.ascontiguousarray(data[:, 1])
+
+#spectra of one file: yields name, frequencies and intensities, one spectrum of a text file,
+#every spectrum of a map file (views into the memory-mapped file, read when used)
+def file_spectra(filename):
+    if is_map(filename):
+        yield from map_spectra(filename)
+        return
+    freq, intens = load_spectrum(filename)
+    yield spectrum_name(filename), freq, intens
+
+#read one or more spectra, returns dicts name -> frequencies and name -> intensities
+def load_spectra(filenames):
+    freqdict=dict()                         #frequencies all spectra
+    intensdict=dict()                       #intensities all spectra
+    for filename in filenames:
+        for key, freq, intens in file_spectra(filename):
+            freqdict[key], intensdict[key] = freq, intens
+    return freqdict, intensdict
+
+#save modified spectrum as "csv"
+#precision: decimals of wave numbers and intensities, a block of lines is formatted with one
+#% operation, same digits as "{:.3f}".format(wn) + delimiter + "{:.2f}".format(y) per line
+#atomic: write to a temporary file and rename it, readers never see a partially written file
+#raises IOError (OSError) if the file can not be written
+def save_dat(filename, freq, intens, delimiter=dat_delimiter, precision=dat_precision, atomic=False):
+    line = f"%.{precision[0]}f" + delimiter.replace('%', '%%') + f"%.{precision[1]}f\n"
+    #wave number, intensity, wave number, ... as python floats
+    values = np.column_stack((np.asarray(freq, dtype=float), np.asarray(intens, dtype=float))).ravel()
+    output_name = f"{filename}.{os.getpid()}.tmp" if atomic else filename
+    try:
+        with open(output_name,"w") as output_file:
+            for start in range(0, len(values), 2 * write_block):
+                block = values[start:start + 2 * write_block].tolist()
+                output_file.write(line * (len(block) // 2) % tuple(block))
+        if atomic:
+            os.replace(output_name, filename)
+    except OSError:
+        if atomic and os.path.exists(output_name):
+            os.remove(output_name)
+        raise
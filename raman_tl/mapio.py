@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+memory-mapped readers for multi-spectrum (map) files
+
+SPC (Galactic / Thermo, new format, little endian): single and multi file, common x axis
+    (evenly spaced or stored x values), 32 bit float, 32 bit and 16 bit integer y data
+    not supported: old format (0x4d), separate x values per sub file (XYXYS)
+NPY: 2D array, first row wave numbers, every other row the intensities of a spectrum
+raw: headerless 2D array in the NPY layout (points and dtype are given)
+
+the files are memory-mapped, the intensities of all spectra are one 2D view into the file
+(SPC: strided over the sub file headers), nothing is read or copied before a spectrum is used,
+integer SPC data are scaled when a spectrum is used (map_spectra, map_spectrum)
+'''
+
+import os                                               #os file processing
+import numpy as np                                      #for several calculations
+
+map_extensions = ('.spc', '.npy')           #file extensions of map files, other files are text spectra
+
+#SPC new format header (512 bytes) and sub file header (32 bytes), only the used fields
+spc_header = np.dtype([('ftflgs', 'u1'), ('fversn', 'u1'), ('fexper', 'u1'), ('fexp', 'i1'),
+                       ('fnpts', '<i4'), ('ffirst', '<f8'), ('flast', '<f8'), ('fnsub', '<i4'),
+                       ('rest', 'V484')])
+spc_subheader = np.dtype([('subflgs', 'u1'), ('subexp', 'i1'), ('subindx', '<u2'), ('subtime', '<f4'),
+                          ('subnext', '<f4'), ('subnois', '<f4'), ('subnpts', '<i4'), ('subscan', '<i4'),
+                          ('subwlevel', '<f4'), ('subresv', 'V4')])
+TSPREC = 0x01                               #SPC flag: 16 bit integer y data
+TMULTI = 0x04                               #SPC flag: multi file
+TXYXYS = 0x40                               #SPC flag: separate x values per sub file
+TXVALS = 0x80                               #SPC flag: x values stored after the header
+SPC_FLOAT = -128                            #SPC exponent of 32 bit float y data
+
+#map file (SPC or NPY) by file extension
+def is_map(filename):
+    return os.path.splitext(filename)[1].lower() in map_extensions
+
+#SPC file, returns wave numbers, the y data of all sub files (sub files x points, view into the file)
+#and the factor of every sub file for integer y data (None for float data)
+#raises ValueError for unsupported or broken files
+def load_spc(filename):
+    data = np.memmap(filename, dtype=np.uint8, mode='r')
+    if len(data) < spc_header.itemsize:
+        raise ValueError(f"{filename}: not a SPC file")
+    header = data[:spc_header.itemsize].view(spc_header)[0]
+    flags = int(header['ftflgs'])
+    if header['fversn'] != 0x4b:
+        raise ValueError(f"{filename}: only the new SPC format (0x4b) is supported")
+    if flags & TXYXYS:
+        raise ValueError(f"{filename}: SPC files with separate x values per sub file are not supported")
+    L = int(header['fnpts'])
+    n = int(header['fnsub']) if flags & TMULTI else 1
+    position = spc_header.itemsize
+    if flags & TXVALS:
+        freq = data[position:position + 4 * L].view('<f4')
+        position += 4 * L
+    else:
+        freq = np.linspace(header['ffirst'], header['flast'], L)
+    width = 2 if flags & TSPREC and header['fexp'] != SPC_FLOAT else 4
+    dtype = '<f4' if header['fexp'] == SPC_FLOAT else ('<i2' if width == 2 else '<i4')
+    stride = spc_subheader.itemsize + width * L
+    if position + n * stride > len(data):
+        raise ValueError(f"{filename}: SPC file is truncated")
+    Y = np.ndarray((n, L), dtype=dtype, buffer=data, offset=position + spc_subheader.itemsize,
+                   strides=(stride, width))
+    if header['fexp'] == SPC_FLOAT:
+        return freq, Y, None
+    #integer y data: y * 2^(exponent - bits), exponent of the sub file in multi files
+    exponents = np.full(n, int(header['fexp']))
+    if flags & TMULTI:
+        subheaders = np.ndarray(n, dtype=spc_subheader, buffer=data, offset=position, strides=(stride,))
+        exponents = subheaders['subexp'].astype(int)
+    return freq, Y, np.ldexp(1.0, exponents - 8 * width)
+
+#NPY map: first row wave numbers, the other rows the intensities, returns wave numbers and intensities (views)
+def load_npy_map(filename):
+    data = np.load(filename, mmap_mode='r')
+    if data.ndim != 2 or len(data) < 2:
+        raise ValueError(f"{filename}: NPY map must be 2D, first row wave numbers, one row per spectrum")
+    return data[0], data[1:]
+
+#raw map in the NPY layout without header: points per spectrum and dtype must be given
+def load_raw_map(filename, points, dtype='<f8'):
+    data = np.memmap(filename, dtype=dtype, mode='r')
+    if len(data) % points or len(data) < 2 * points:
+        raise ValueError(f"{filename}: size does not fit {points} points per spectrum")
+    data = data.reshape(-1, points)
+    return data[0], data[1:]
+
+#wave numbers, intensities (spectra x points) and factors (None or one per spectrum) of a map file
+def load_map(filename):
+    if os.path.splitext(filename)[1].lower() == '.spc':
+        return load_spc(filename)
+    return load_npy_map(filename) + (None,)
+
+#number of spectra in a map file (only the header is read)
+def map_size(filename):
+    return len(load_map(filename)[1])
+
+#name of spectrum index of a map with n spectra: file name without extension and index
+def map_name(filename, index, n):
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if n == 1:
+        return stem
+    return f"{stem}-{index:0{len(str(n - 1))}d}"
+
+#map files that share the file name without extension with another input file, their spectra
+#would get the same names and the outputs would overwrite each other (e.g. sample.spc and sample.npy)
+def map_collisions(filenames):
+    stems = dict()                                      #file name without extension -> files
+    for filename in filenames:
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        stems.setdefault(stem, list()).append(filename)
+    return [filename for files in stems.values() if len(files) > 1 for filename in files if is_map(filename)]
+
+#spectrum index of a map file: name, wave numbers, intensities (view or scaled copy for integer data)
+def map_spectrum(filename, index):
+    freq, Y, factors = load_map(filename)
+    intens = Y[index] if factors is None else Y[index] * factors[index]
+    return map_name(filename, index, len(Y)), freq, intens
+
+#all spectra of a map file: yields name, wave numbers and intensities, see map_spectrum
+def map_spectra(filename):
+    freq, Y, factors = load_map(filename)
+    for index in range(len(Y)):
+        intens = Y[index] if factors is None else Y[index] * factors[index]
+        yield map_name(filename, index, len(Y)), freq, intens
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+parallel processing of input files in a process pool
+
+every file is loaded and processed (baseline, smoothing, peaks) in a worker process,
+the results are handed back to the parent for plotting and export, in input order
+map files (SPC, NPY) are split into one task per spectrum, every worker memory-maps
+the file and reads only its spectrum
+'''
+
+import os                                               #number of cores
+from concurrent.futures import ProcessPoolExecutor     #process pool
+from .fileio import load_spectrum, spectrum_name        #read spectra
+from .mapio import is_map, map_size, map_spectrum       #memory-mapped map files
+from .processing import RunResult, process_spectrum     #processing pipeline
+from .cache import process_file_cached                  #on-disk cache
+
+#number of worker processes for jobs = 0 (all cores)
+def default_jobs():
+    return os.cpu_count() or 1
+
+#load and process one file, runs in the worker process
+#cache: ResultCache or None (no cache), index: spectrum of a map file (not cached)
+def process_file(filename, options, cache=None, index=None):
+    if index is not None:
+        return process_spectrum(*map_spectrum(filename, index), options)
+    if cache is not None:
+        return process_file_cached(filename, options, cache)
+    freq, intens = load_spectrum(filename)
+    return process_spectrum(spectrum_name(filename), freq, intens, options)
+
+#process files in a pool of jobs worker processes (jobs = 0: all cores)
+#returns the RunResult (input order) and a list of (filename, exception) of failed files,
+#a failed file does not stop the other files, cache: ResultCache or None (no cache)
+def process_files(filenames, options, jobs=0, cache=None):
+    if not jobs:
+        jobs = default_jobs()
+    run = RunResult(options)
+    failed = list()
+    tasks = list()                          #(filename, None) per text file, (filename, index) per spectrum of a map
+    for filename in filenames:
+        if not is_map(filename):
+            tasks.append((filename, None))
+            continue
+        try:
+            tasks.extend((filename, index) for index in range(map_size(filename)))
+        except (IOError, ValueError) as error:
+            failed.append((filename, error))
+    if not tasks:
+        return run, failed
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        futures = [executor.submit(process_file, filename, options, cache, index) for filename, index in tasks]
+        for (filename, _), future in zip(tasks, futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                failed.append((filename, error))
+                continue
+            run.spectra[result.name] = result
+    if cache is not None:
+        cache.evict()
+    return run, failed
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+plots of processed spectra: summary, single spectra, overlay and stacked spectra
+
+all plot functions read from the processing results (RunResult / SpectrumResult)
+and return the matplotlib figure, saving is done by the caller
+traces longer than trace_points are decimated to screen resolution (min / max per bucket)
+the summary of many spectra is split into pages of summary_page spectra (summary_pages),
+the heat map shows all smoothed spectra in one compact image (heatmap_row, plot_heatmap)
+'''
+
+import numpy as np                                      #for several calculations
+import matplotlib.pyplot as plt                         #for plots
+from datetime import datetime                           #print date and time in plot
+from .processing import overlay_curve, aggregate_peaks  #overlay and stacked spectra
+from .processing import RunResult                       #pages of the summary
+
+head_space_y_o_s =0.10                      #head space for legend (in %) for overlay and stacked spectra
+
+# plot config section
+y_label = "intensity"                       #label of y-axis
+x_label = r'raman shift /cm$^{-1}$'         #label of the x-axis
+figure_dpi = 150                            #DPI of the picture
+trace_points = 4000                         #max. points of a plotted trace, about 2 per pixel of an enlarged figure
+summary_page = 8                            #spectra per page of the summary plot
+heatmap_points = 1000                       #wave number columns of the heat map
+
+#label of the smoothing filter, same for all spectra
+def smoothing_label(options):
+    if options.wp:
+        wl, po = options.wp
+        return 'smoothed data\n' + 'Savitzky-Golay filter\n' + 'window-length = '+ str(wl) + '\npoly-order = ' + str (po)
+    elif options.whittaker_lmd:
+        return 'smoothed data\n' + 'Whittaker filter\n' + r'$\lambda$ = '+ str(options.whittaker_lmd)
+    else:
+        return 'smoothed data\n' + 'Whittaker filter\n' + r'$\lambda$ = 1'
+
+#increase figure size N x M
+def enlarge(fig, N, M):
+    plSize = fig.get_size_inches()
+    fig.set_size_inches((plSize[0]*N, plSize[1]*M))
+
+#x and y of a trace with at most points points: min and max of every bucket (in order),
+#peaks and the noise band stay visible, short traces are returned as they are
+def decimate(x, y, points=trace_points):
+    n = len(y)
+    if n <= points:
+        return x, y
+    size = -(-n // (points // 2))           #points per bucket
+    m = n // size                           #full buckets, the rest is kept
+    buckets = np.asarray(y[:m * size]).reshape(m, size)
+    offsets = np.arange(m)[:, None] * size
+    index = np.sort(np.column_stack((buckets.argmin(axis=1), buckets.argmax(axis=1))), axis=1) + offsets
+    index = np.concatenate((index.ravel(), np.arange(m * size, n)))
+    return np.asarray(x)[index], np.asarray(y)[index]
+
+#label peaks in ax
+def annotate_peaks(ax, peakz, heights):
+    for txt, height in zip(peakz, heights):
+        ax.annotate(int(np.round(txt)),xy=(txt,height),ha="center",rotation=90,size=6,
+            xytext=(0,5), textcoords='offset points')
+
+#auto y range of the smoothed spectrum
+def auto_ylim(ax, y, head_space):
+    try:
+        ymax=max(y)
+        ymin=min(y)
+        ax.set_ylim(ymin-ymax*0.05,ymax+ymax*head_space)
+    except ValueError:
+        print('Warning! xmin or xmax are out of range or (almost) equal.')
+
+#label of the arPLS lambda
+def lambda_label(lam):
+    return r'$\lambda$ = ' + f'{lam:g}'
+
+#pages of the summary plot, RunResults with per_page spectra each (the last one with the rest)
+def summary_pages(run, per_page=summary_page):
+    results = list(run)
+    pages = list()
+    for start in range(0, len(results), per_page):
+        page = RunResult(run.options)
+        page.spectra = {result.name: result for result in results[start:start + per_page]}
+        pages.append(page)
+    return pages
+
+#summary plot: raw data and baseline, baseline corrected data, smoothed data with peaks
+#one column per spectrum, command_line is printed at the bottom
+#the lambdas of every spectrum are shown (selected per spectrum with 'auto')
+#page: page label (e.g. "page 1 / 3") printed at the bottom, None: no label
+def plot_summary(run, command_line='', page=None):
+    #get number of data sets
+    number_of_files=len(run)
+    #prepare plot
+    fig, ax = plt.subplots(3,number_of_files,tight_layout = True,squeeze=False)
+    #get key (name) of spectra and counter
+    for counter, result in enumerate(run):
+        crop = result.crop
+        options = result.options or run.options
+        #only one data set: all names as title
+        if number_of_files == 1:
+            ax[0,counter].set_title(" ".join(run.spectra.keys()))
+        #change font size according to the number of spectra
+        elif number_of_files > 5:
+            ax[0,counter].set_title(result.name,fontsize=5)
+        else:
+            ax[0,counter].set_title(result.name,fontsize=8)
+
+        #plot raw data
+        ax[0,counter].plot(*decimate(result.freq,result.intens),color='black',linewidth=1,label='raw data')
+        #plot baseline
+        ax[0,counter].plot(*decimate(result.freq,result.baseline),color='red',linewidth=1,
+            label='baseline\n'+ lambda_label(options.lam))
+
+        #plot baseline corrected spectrum - take care of xmin & xmax - in summary plot
+        ax[1,counter].plot(*decimate(result.freq[crop],result.corrected[crop]),color='black',linewidth=1,
+            label='baseline corrected data\n'+ lambda_label(options.lam))
+
+        #plot baseline corrected, filtered spectrum - take care of xmin & xmax
+        ax[2,counter].plot(*decimate(result.freq[crop],result.filtered[crop]),color='black',linewidth=1,
+            label=smoothing_label(options))
+
+        #spectrum title, legend and labels
+        ax[0,counter].legend(loc='upper left',fontsize='8')
+        ax[1,counter].legend(loc='upper left',fontsize='8')
+        ax[2,counter].legend(loc='upper left',fontsize='8')
+        ax[2,counter].set_xlabel(x_label)
+        ax[0,0].set_ylabel(y_label)
+        ax[1,0].set_ylabel(y_label)
+        ax[2,0].set_ylabel(y_label)
+
+        #label peaks
+        annotate_peaks(ax[2,counter], result.peakz, result.filtered[crop][result.peaks])
+        auto_ylim(ax[2,counter], result.filtered[crop], 0.15)
+
+    #instructions for the plots
+    fig.text(0.01,0.005,command_line, color='blue', size=6)
+    #page of a summary with several pages
+    if page:
+        fig.text(0.99,0.005,page, color='blue', size=6, ha='right')
+    #short disclaimer and link
+    fig.text(0.01,0.99, str(datetime.now().strftime("%d-%b-%Y %H:%M:%S")) + " -- " + 'data processed with raman-tl.py, use the script at your own risk and responsibility (click here for more information)', color = 'red', size=6, url='https://github.com/radi0sus/raman_tl')
+
+    #increase figure size N (number of data sets) x M
+    enlarge(fig, number_of_files, 2)
+    return fig
+
+#single spectrum: smoothed data with peaks
+def plot_spectrum(result, options):
+    fig, ax = plt.subplots()
+    crop = result.crop
+    ax.plot(*decimate(result.freq[crop],result.filtered[crop]),color='black',linewidth=1,
+        label=smoothing_label(result.options or options))
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.set_title(result.name)
+
+    annotate_peaks(ax, result.peakz, result.filtered[crop][result.peaks])
+    auto_ylim(ax, result.filtered[crop], 0.10)
+
+    enlarge(fig, 1.5, 1.5)
+    return fig
+
+#wave number grid of the heat map: range (xmin to xmax) of the first result with at least 2 points
+def heatmap_grid(results, points=heatmap_points):
+    for result in results:
+        freq = result.freq[result.crop]
+        if len(freq) > 1:
+            return np.linspace(freq.min(), freq.max(), points)
+    return None
+
+#smoothed spectrum (xmin to xmax) of result interpolated on grid, nan outside its range, float32
+def heatmap_row(result, grid):
+    freq = result.freq[result.crop]
+    if len(freq) < 2:
+        return np.full(len(grid), np.nan, dtype=np.float32)
+    order = np.argsort(freq)
+    return np.interp(grid, freq[order], result.filtered[result.crop][order],
+                     left=np.nan, right=np.nan).astype(np.float32)
+
+#heat map of the smoothed spectra, rows: heatmap_row of every spectrum, names: names of the rows
+#spectrum names are shown for up to 40 spectra
+def plot_heatmap(rows, grid, names):
+    fig, ax = plt.subplots()
+    image = ax.imshow(np.asarray(rows), aspect='auto', interpolation='nearest', cmap='viridis',
+                      extent=(grid[0], grid[-1], len(rows) - 0.5, -0.5))
+    fig.colorbar(image, ax=ax, label=y_label)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel('spectrum')
+    if len(names) <= 40:
+        ax.set_yticks(range(len(names)))
+        ax.set_yticklabels(names, fontsize=6)
+    ax.set_title(f'heat map of {len(names)} spectra (smoothed data)')
+    enlarge(fig, 1.5, 1.5)
+    return fig
+
+#axis labels, title, legend and head space of overlay and stacked spectra
+def finish_overlay(fig, ax, title):
+    #increase figure size N x M
+    enlarge(fig, 1.5, 1.5)
+    #+x% in y
+    ax.set_ylim(ax.get_ylim()[0],ax.get_ylim()[1]*head_space_y_o_s+ax.get_ylim()[1])
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.set_title(title)
+    ax.legend(loc='upper left',fontsize='8')
+
+#overlay spectra - not normalized
+def plot_overlay(run):
+    return plot_overlay_mode(run, 'overlay', 'overlay spectrum (not normalized)')
+
+#overlay spectra - normalized
+def plot_overlay_normalized(run):
+    return plot_overlay_mode(run, 'normalized', 'overlay spectrum (normalized)')
+
+#stacked spectra - normalized
+def plot_stacked(run):
+    fig = plot_overlay_mode(run, 'stacked', 'stacked spectrum (normalized)')
+    fig.axes[0].set_yticks([])
+    return fig
+
+#overlay or stacked spectra, mode: 'overlay', 'normalized' or 'stacked' (see processing.overlay_curve)
+#peaks are detected once per spectrum (processing.aggregate_peaks)
+def plot_overlay_mode(run, mode, title):
+    fig, ax = plt.subplots()
+    for counter, result in enumerate(run):
+        ax.plot(*decimate(result.freq[result.crop],overlay_curve(result, mode, counter)),linewidth=1,
+            label=result.name)
+    peak_freq, peak_height, _ = aggregate_peaks(run, mode)
+    annotate_peaks(ax, peak_freq, peak_height)
+    finish_overlay(fig, ax, title)
+    return fig
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+processing pipeline for Raman spectra
+
+offsets -> arPLS baseline -> baseline correction -> smoothing -> xmin / xmax -> peak detection
+
+every spectrum is processed once, the results are stored in a SpectrumResult,
+all spectra of a run in a RunResult, plots and exports read from them
+'''
+
+from dataclasses import dataclass, field, replace       #options and results
+import numpy as np                                      #for several calculations
+from scipy.signal import find_peaks                     #for peak detection
+from .baseline import baseline_arPLS, lam               #arPLS baseline correction
+from .baseline import arPLS_sweep                       #warm started arPLS over a lambda grid
+from .smoothing import smooth, whittaker_lmd            #Whittaker / Savitzky–Golay filter
+from .solvers import default_solver                     #solver backends for arPLS
+from .selection import auto, auto_baseline_lambda, auto_whittaker_lambda    #V-curve lambda selection
+from .profiling import stage                            #per stage timing
+
+threshold_factor = 0.05                     #threshold factor for auto peak detection
+peak_distance = 8                           #peak distance for peak detection
+normalized_height=0.05                      #threshold for peak detection in the normalized overlay and stacked spectra
+stack_space = 0.3                           #extra space between stacked spectra
+
+#processing parameters, defaults are the defaults of the command line
+#lam and whittaker_lmd can be 'auto': selected per spectrum with the V-curve (selection.py)
+@dataclass
+class Options:
+    lam: float = lam                        #lambda for arPLS (baseline) correction
+    solver: str = default_solver            #solver backend for arPLS
+    whittaker_lmd: float = whittaker_lmd    #lambda for the Whittaker filter
+    wp: tuple = None                        #(window length, polynomial order) activates the Savitzky–Golay filter
+    xmin: float = None                      #start spectra at xmin wave numbers
+    xmax: float = None                      #end spectra at xmax wave numbers
+    threshold: float = None                 #threshold for peak detection, None is auto threshold
+    multiply: float = None                  #multiply intensities with abs(multiply)
+    add: float = None                       #add to wave numbers
+    intensities: float = 0                  #add to baseline corrected intensities
+
+#results of one spectrum
+@dataclass
+class SpectrumResult:
+    name: str                               #name of the spectrum
+    freq: np.ndarray                        #wave numbers (with offset)
+    intens: np.ndarray                      #intensities (with multiplier)
+    baseline: np.ndarray                    #arPLS baseline
+    corrected: np.ndarray                   #baseline corrected intensities
+    filtered: np.ndarray                    #baseline corrected and smoothed intensities
+    start: int                              #first index of the xmin to xmax range
+    stop: int                               #index after the last point of the xmin to xmax range
+    peaks: np.ndarray                       #peak indices, relative to start
+    threshold: float = None                 #threshold used for peak detection
+    options: Options = None                 #options of this spectrum, with the selected lambdas if 'auto'
+
+    #slice xmin to xmax
+    @property
+    def crop(self):
+        return slice(self.start, self.stop)
+
+    #peak wave numbers
+    @property
+    def peakz(self):
+        return self.freq[self.crop][self.peaks]
+
+#results of all spectra of one run, in input order
+@dataclass
+class RunResult:
+    options: Options
+    spectra: dict = field(default_factory=dict)     #name -> SpectrumResult
+
+    def __len__(self):
+        return len(self.spectra)
+
+    def __iter__(self):
+        return iter(self.spectra.values())
+
+#multiply intensities and add to wave numbers if given
+def apply_offsets(freq, intens, multiply=None, add=None):
+    freq = np.asarray(freq, dtype=float)
+    intens = np.asarray(intens, dtype=float)
+    if multiply:
+        intens = intens * abs(multiply)
+    if add:
+        freq = freq + add
+    return freq, intens
+
+#index of the point closest to x, freq must be monotonic (ascending or descending)
+def nearest_index(freq, x):
+    n = len(freq)
+    if n < 2:
+        return 0
+    descending = freq[0] > freq[-1]
+    axis = freq[::-1] if descending else freq
+    i = int(np.clip(np.searchsorted(axis, x), 1, n - 1))
+    #left or right neighbour, on a tie the lower index of freq like min() over the indices
+    if descending:
+        i = i - 1 if x - axis[i-1] < axis[i] - x else i
+        return n - 1 - i
+    return i - 1 if x - axis[i-1] <= axis[i] - x else i
+
+#range of the points between xmin and xmax (both included), returns start and stop for slicing
+#freq can be ascending or descending, no xmin / xmax: from the first / up to the last point
+def crop_indices(freq, xmin=None, xmax=None):
+    freq = np.asarray(freq)
+    n = len(freq)
+    if n == 0:
+        return 0, 0
+    descending = freq[0] > freq[-1]
+    if xmin:
+        #get index closest to xmin
+        xmin_index = nearest_index(freq, xmin)
+    else:
+        #else lowest wave number
+        xmin_index = n - 1 if descending else 0
+    if xmax:
+        #get index closest to xmax
+        xmax_index = nearest_index(freq, xmax)
+    else:
+        #else highest wave number
+        xmax_index = 0 if descending else n - 1
+    return min(xmin_index, xmax_index), max(xmin_index, xmax_index) + 1
+
+#peak detection threshold: abs(threshold) if given, else auto threshold
+def peak_threshold(y, threshold=None):
+    if threshold is not None:
+        return abs(threshold)
+    try:
+        return (max(y)+abs(min(y)))*threshold_factor
+    except ValueError:
+        print('Warning! xmin or xmax are out of range or (almost) equal.')
+        return None
+
+#peak indices of y
+def detect_peaks(y, height=None, distance=peak_distance):
+    peaks , _ = find_peaks(y,height=height,distance=distance)
+    return peaks
+
+#baseline, correction, smoothing, xmin / xmax and peaks of one spectrum
+#baseline: precalculated arPLS baseline, calculated if None
+def process_spectrum(name, freq, intens, options=None, baseline=None):
+    if options is None:
+        options = Options()
+    freq, intens = apply_offsets(freq, intens, options.multiply, options.add)
+
+    if options.lam == auto:
+        with stage('auto_lambda', name):
+            options = replace(options, lam=float(auto_baseline_lambda(intens)[0]))
+    if baseline is None:
+        with stage('baseline', name) as info:
+            baseline = baseline_arPLS(intens, lam=options.lam, solver=options.solver, info=info)
+    #baseline correct spectrum (intensities)
+    corrected = intens - baseline
+    #add +y to intensities if given
+    if options.intensities:
+        corrected = corrected + options.intensities
+
+    if options.whittaker_lmd == auto and not options.wp:
+        with stage('auto_lambda', name):
+            options = replace(options, whittaker_lmd=float(auto_whittaker_lambda(corrected)[0]))
+    with stage('smooth', name):
+        filtered = smooth(corrected, wp=options.wp, lmd=options.whittaker_lmd)
+
+    return finish_spectrum(name, freq, intens, baseline, corrected, filtered, options)
+
+#xmin / xmax and peaks of a baseline corrected and smoothed spectrum
+#only depends on the display options (xmin, xmax, threshold), cached spectra only run this stage
+def finish_spectrum(name, freq, intens, baseline, corrected, filtered, options):
+    with stage('peaks', name):
+        start, stop = crop_indices(freq, options.xmin, options.xmax)
+        crop = slice(start, stop)
+        threshold = peak_threshold(filtered[crop], options.threshold)
+        peaks = detect_peaks(filtered[crop], height=threshold)
+
+    return SpectrumResult(name, freq, intens, baseline, corrected, filtered,
+                          start, stop, peaks, threshold, options)
+
+#one spectrum for every lambda of lams, the arPLS solves are warm started (see baseline.arPLS_sweep)
+#returns a SpectrumResult per lambda (options with this lambda) and the arPLS iterations per lambda
+def sweep_spectrum(name, freq, intens, lams, options=None):
+    if options is None:
+        options = Options()
+    _, y = apply_offsets(freq, intens, options.multiply, options.add)
+    baselines, counts = arPLS_sweep(y, lams, solver=options.solver)
+    results = [process_spectrum(name, freq, intens, replace(options, lam=lam_), baseline)
+               for lam_, baseline in zip(lams, baselines)]
+    return results, counts
+
+#spectra of equal length, yields the indices and the intensities (with multiplier) as spectra x points
+def length_groups(intenslist, options):
+    groups = dict()                         #length -> indices of spectra
+    for index, intens in enumerate(intenslist):
+        groups.setdefault(len(intens), list()).append(index)
+    for indices in groups.values():
+        Y = np.array([np.asarray(intenslist[index], dtype=float) for index in indices])
+        if options.multiply:
+            Y *= abs(options.multiply)
+        yield indices, Y
+
+#arPLS lambdas of several spectra selected with the V-curve, spectra of equal length together
+def auto_lambdas(intenslist, options):
+    lams = [None] * len(intenslist)
+    for indices, Y in length_groups(intenslist, options):
+        with stage('auto_lambda', f"{len(indices)} spectra", spectra=len(indices)):
+            selected = auto_baseline_lambda(Y)
+        for index, lam_ in zip(indices, selected):
+            lams[index] = float(lam_)
+    return lams
+
+#process all spectra, freqdict and intensdict: name -> frequencies / intensities
+def process_spectra(freqdict, intensdict, options=None):
+    if options is None:
+        options = Options()
+    run = RunResult(options)
+    keys = list(freqdict.keys())
+    intenslist = [intensdict[key] for key in keys]
+    if options.lam == auto:
+        optionslist = [replace(options, lam=lam_) for lam_ in auto_lambdas(intenslist, options)]
+    else:
+        optionslist = [options] * len(keys)
+    for key, options_ in zip(keys, optionslist):
+        run.spectra[key] = process_spectrum(key, freqdict[key], intensdict[key], options_)
+    return run
+
+#y values (xmin to xmax) of a spectrum in the overlay and stacked plots
+#mode: 'overlay' (not normalized), 'normalized' or 'stacked' (normalized, shifted by counter)
+def overlay_curve(result, mode='overlay', counter=0):
+    y = result.filtered[result.crop]
+    if mode == 'overlay':
+        return y
+    #normalize
+    y = y / np.max(y)
+    if mode == 'stacked':
+        #add counter (+1) + some space for stacking
+        y = y + counter + counter*stack_space
+    return y
+
+#peak detection threshold of the overlay and stacked plots
+def overlay_threshold(run, mode='overlay', counter=0):
+    if mode == 'stacked':
+        #normalized_height (5%) + stacking head-space
+        return normalized_height + counter + counter*stack_space
+    if mode == 'normalized':
+        return normalized_height
+    if run.options.threshold is not None:
+        return abs(run.options.threshold)
+    #auto threshold from the smoothed spectra of all spectra (xmin to xmax)
+    segments = [result.filtered[result.crop] for result in run if result.stop > result.start]
+    if not segments:
+        return None
+    return (max(np.max(y) for y in segments)+abs(min(np.min(y) for y in segments)))*threshold_factor
+
+#peaks of all spectra for the overlay and stacked plots, see overlay_curve for mode
+#find_peaks runs once per spectrum on its own xmin to xmax segment, there are no false peaks
+#at the borders between spectra and earlier spectra are not searched again
+#returns wave numbers, heights and spectrum numbers (input order) of the peaks
+def aggregate_peaks(run, mode='overlay'):
+    found = list()
+    total = 0
+    #the auto threshold of the not normalized overlay is the same for all spectra
+    threshold = overlay_threshold(run, mode)
+    for counter, result in enumerate(run):
+        y = overlay_curve(result, mode, counter)
+        if mode == 'stacked':
+            threshold = overlay_threshold(run, mode, counter)
+        peaks = detect_peaks(y, height=threshold)
+        found.append((result, y, peaks))
+        total += len(peaks)
+    #merge into preallocated arrays
+    peak_freq = np.empty(total)
+    peak_height = np.empty(total)
+    peak_spectrum = np.empty(total, dtype=int)
+    position = 0
+    for counter, (result, y, peaks) in enumerate(found):
+        end = position + len(peaks)
+        peak_freq[position:end] = result.freq[result.crop][peaks]
+        peak_height[position:end] = y[peaks]
+        peak_spectrum[position:end] = counter
+        position = end
+    return peak_freq, peak_height, peak_spectrum
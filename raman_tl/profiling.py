@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+per stage timing and profiling of the processing pipeline
+
+the pipeline marks its stages with stage(...), for every stage the registered hooks
+(add_hook) are called with a StageRecord: stage, spectrum name, wall time,
+peak memory (tracemalloc, if tracing) and stage information (e.g. arPLS iterations and crit)
+without hooks a stage only costs a function call
+
+stages: load, baseline (arPLS of one spectrum), auto_lambda, smooth, peaks (crop and
+peak detection), export (-mod.csv), summary, plot (figure of a spectrum), pdf (pdf.savefig),
+png (PNG rasterization), overlays
+
+Profiler collects the records of a run and writes a report (.json or .csv),
+only the stages of this process are recorded (not of the workers of the process pool)
+'''
+
+import csv                                              #csv report
+import json                                             #json report
+import time                                             #wall time
+import tracemalloc                                      #peak memory
+from contextlib import contextmanager                   #stages
+from dataclasses import dataclass, field, asdict        #stage records
+
+hooks = list()                              #callbacks, called with the StageRecord of every stage
+memory_stack = list()                       #[traced memory at the start, peak of finished inner stages] of open stages
+report_columns = ('stage', 'name', 'seconds', 'peak_memory', 'iterations', 'crit', 'spectra')   #csv report
+
+#one stage of one spectrum (or of several spectra: auto_lambda, summary, overlays)
+#peak_memory: bytes allocated during the stage above the start (0 if tracemalloc is not tracing)
+@dataclass
+class StageRecord:
+    stage: str
+    name: str
+    seconds: float
+    peak_memory: int = 0
+    info: dict = field(default_factory=dict)
+
+#register a callback, called with a StageRecord at the end of every stage
+def add_hook(callback):
+    hooks.append(callback)
+
+def remove_hook(callback):
+    if callback in hooks:
+        hooks.remove(callback)
+
+#mark a stage of the pipeline, yields the info dict, the stage can add information to it
+#nested stages: the peak memory of the outer stage includes the inner stages
+@contextmanager
+def stage(stage_name, name='', **info):
+    if not hooks:
+        yield info
+        return
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        #the peak of the outer stage up to here, reset_peak starts the peak of this stage
+        if memory_stack:
+            memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+        memory_stack.append([current, current])
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        seconds = time.perf_counter() - start
+        peak_memory = 0
+        if tracing:
+            start_memory, inner_peak = memory_stack.pop()
+            peak = max(tracemalloc.get_traced_memory()[1], inner_peak)
+            peak_memory = peak - start_memory
+            if memory_stack:
+                memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+        record = StageRecord(stage_name, name, seconds, peak_memory, info)
+        for hook in list(hooks):
+            hook(record)
+
+#collects the StageRecords of a run, use as context manager or call start() and stop()
+#memory: trace the peak memory of the stages with tracemalloc, about 3 times slower
+#(most of it in matplotlib), the wall times are not representative then
+class Profiler:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.records = list()
+        self.started = False                #tracemalloc started by this profiler
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started = True
+        add_hook(self)
+
+    def stop(self):
+        remove_hook(self)
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    #total wall time, number of records and largest peak memory of every stage (in order of appearance)
+    def summary(self):
+        totals = dict()
+        for record in self.records:
+            total = totals.setdefault(record.stage, {'seconds': 0.0, 'count': 0, 'peak_memory': 0})
+            total['seconds'] += record.seconds
+            total['count'] += 1
+            total['peak_memory'] = max(total['peak_memory'], record.peak_memory)
+        return totals
+
+    #print the summary as table
+    def print_summary(self):
+        print(f"{'stage':<16}{'count':>8}{'seconds':>12}{'peak MB':>10}")
+        for stage_name, total in self.summary().items():
+            print(f"{stage_name:<16}{total['count']:>8}{total['seconds']:>12.4f}"
+                  f"{total['peak_memory'] / 1024**2:>10.1f}")
+
+    #write the records to filename, .csv: one line per record (report_columns, lists joined with spaces),
+    #else json: {"summary": ..., "records": [...]}
+    #raises IOError (OSError) if the file can not be written
+    def save(self, filename):
+        if filename.lower().endswith('.csv'):
+            with open(filename, 'w', newline='') as output_file:
+                writer = csv.writer(output_file)
+                writer.writerow(report_columns)
+                for record in self.records:
+                    row = asdict(record)
+                    row.update(record.info)
+                    writer.writerow([' '.join(map(str, row[column])) if isinstance(row.get(column), list)
+                                     else row.get(column, '') for column in report_columns])
+            return
+        with open(filename, 'w') as output_file:
+            json.dump({'summary': self.summary(), 'records': [asdict(record) for record in self.records]},
+                      output_file, indent=1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+rendering of the single spectrum figures, optionally in worker processes
+
+the figures are built from the result arrays (SpectrumResult), long traces are decimated
+to screen resolution (plotting.decimate)
+with jobs > 1 PNG only runs are rasterized in worker processes (Agg backend), the results are sent
+to the workers as arrays
+with summary.pdf everything is rendered in this process: the pages are one PDF stream in input order,
+every figure is built once and saved to the page and the PNG, the workers are not used
+
+select_results limits the figures to spectra with matching names and to a budget of
+evenly spaced spectra
+'''
+
+import os                                               #os file processing
+import fnmatch                                          #name patterns
+from collections import deque                           #pending PNGs
+from concurrent.futures import ProcessPoolExecutor     #process pool
+from .stream import select_spectra                      #evenly spaced selection
+from .parallel import default_jobs                      #number of cores
+from .profiling import stage                            #per stage timing
+
+#results with a name matching pattern (fnmatch, None: all), at most budget evenly spaced of them (None: all)
+def select_results(results, budget=None, pattern=None):
+    results = [result for result in results if pattern is None or fnmatch.fnmatch(result.name, pattern)]
+    if budget is None:
+        return results
+    return [results[index] for index in select_spectra(len(results), budget)]
+
+#non-interactive backend of the worker processes
+def use_agg():
+    import matplotlib
+    matplotlib.use('Agg')
+
+#plot of a single spectrum to pdf (PdfPages or None) and / or name.png
+def save_spectrum(result, options, file_output_path, pdf=None, save_plots_png=False):
+    import matplotlib.pyplot as plt
+    from . import plotting
+
+    with stage('plot', result.name):
+        fig = plotting.plot_spectrum(result, options)
+
+    #save single plots as png
+    if save_plots_png:
+        with stage('png', result.name):
+            fig.savefig(os.path.join(file_output_path, result.name + ".png"), dpi=plotting.figure_dpi)
+
+    #save single plots to summary.pdf
+    if pdf is not None:
+        with stage('pdf', result.name):
+            pdf.savefig(fig)
+    plt.close(fig)
+
+#PNG of a single spectrum, runs in the worker process
+def save_spectrum_png(result, options, file_output_path):
+    save_spectrum(result, options, file_output_path, save_plots_png=True)
+
+#renders the single spectrum figures one by one (render) as the results arrive, call close() at the end
+#jobs: worker processes for the PNGs, 1: everything in this process, 0: all cores
+#the workers are only used without pdf, a figure for the page and the PNG is built once in this process
+#at most 2 * jobs PNGs are pending, the results in flight stay bounded (streaming mode)
+class SpectrumRenderer:
+    def __init__(self, options, file_output_path, pdf=None, save_plots_png=False, jobs=1):
+        self.options = options
+        self.file_output_path = file_output_path
+        self.pdf = pdf
+        self.save_plots_png = save_plots_png
+        self.jobs = jobs or default_jobs()
+        self.executor = None
+        self.pending = deque()              #futures of the PNGs in the workers
+        if self.jobs > 1 and save_plots_png and pdf is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=use_agg)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def render(self, result):
+        if self.executor is None:
+            save_spectrum(result, self.options, self.file_output_path, self.pdf, self.save_plots_png)
+            return
+        while len(self.pending) >= 2 * self.jobs:
+            self.pending.popleft().result()
+        self.pending.append(self.executor.submit(save_spectrum_png, result, self.options, self.file_output_path))
+
+    #wait for the pending PNGs, a failed PNG raises its exception here
+    def close(self):
+        if self.executor is None:
+            return
+        try:
+            while self.pending:
+                self.pending.popleft().result()
+        finally:
+            self.executor.shutdown()
+            self.executor = None
+
+#single spectrum figures of results to pdf (PdfPages or None) and / or name.png, see SpectrumRenderer
+def render_spectra(results, options, file_output_path, pdf=None, save_plots_png=False, jobs=1):
+    with SpectrumRenderer(options, file_output_path, pdf, save_plots_png, jobs) as renderer:
+        for result in results:
+            renderer.render(result)
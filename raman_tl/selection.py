@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+
+# automatic lambda selection with the V-curve, see:
+"A Perfect Smoother"
+Paul H. C. Eilers
+Anal. Chem. 2003, 75, 14, 3631–3636
+DOI: https://doi.org/10.1021/ac034173t
+
+for every lambda of a log spaced grid the spectrum is fitted, the curve of
+log(penalty) = log(|D z|^2) vs. log(fit) = log(sum w (y - z)^2) is V-shaped,
+the optimum is at the bottom of the V: the geometric mean of the two neighbouring
+lambdas with the shortest distance on the curve
+
+arPLS: w are the arPLS weights of the fitted baseline, Whittaker: w = 1
+
+all spectra (of equal length) and all lambdas of the grid are fitted as the rows of one array,
+one row per spectrum and lambda, the weights of all rows are updated at once, every row
+is solved with the penalty band of its lambda (baseline_arPLS_batch and solve_banded_batch
+with an array of lambdas)
+
+'''
+
+import numpy as np                                      #for several calculations
+from .baseline import baseline_arPLS_batch, arPLS_weights   #batched arPLS
+from .solvers import solve_banded_batch                 #batched banded solver
+
+auto = 'auto'                               #lambda option for the automatic selection
+baseline_grid = np.logspace(2, 8, 7)        #lambdas of the V-curve for the arPLS baseline
+whittaker_grid = np.logspace(-2, 4, 13)     #lambdas of the V-curve for the Whittaker filter
+vcurve_iter = 20                            #arPLS iterations per lambda of the grid, enough for the V-curve
+
+#lambda at the bottom of the V-curve for every spectrum, rounded to 3 significant digits
+#fit, pen: (lambdas x spectra) log(fit) and log(penalty) of every lambda of lams
+def vcurve_lambda(lams, fit, pen):
+    distance = np.hypot(np.diff(fit, axis=0), np.diff(pen, axis=0))
+    k = np.argmin(distance, axis=0)
+    return np.array([float(f'{lam_:.3g}') for lam_ in np.sqrt(lams[k] * lams[k + 1])])
+
+#rows of every spectrum of Y (spectra x points) for every lambda, lambda by lambda
+def grid_rows(Y, lams):
+    return np.tile(Y, (len(lams), 1)), np.repeat(lams, len(Y))
+
+#arPLS baseline lambda of every spectrum of Y (spectra x points, equal length)
+def auto_baseline_lambda(Y, lams=baseline_grid, niter=vcurve_iter):
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    lams = np.asarray(lams, dtype=float)
+    rows, lam_rows = grid_rows(Y, lams)
+    Z = baseline_arPLS_batch(rows, lam=lam_rows, niter=niter)
+    d = rows - Z
+    fit = np.log(np.sum(arPLS_weights(d) * d**2, axis=1))
+    pen = np.log(np.sum(np.diff(Z, 2, axis=1)**2, axis=1))
+    return vcurve_lambda(lams, fit.reshape(len(lams), -1), pen.reshape(len(lams), -1))
+
+#Whittaker filter lambda of every spectrum of Y (spectra x points, equal length)
+def auto_whittaker_lambda(Y, lams=whittaker_grid):
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    lams = np.asarray(lams, dtype=float)
+    rows, lam_rows = grid_rows(Y, lams)
+    Z = solve_banded_batch(np.ones_like(rows), rows, lam_rows)
+    fit = np.log(np.sum((rows - Z)**2, axis=1))
+    pen = np.log(np.sum(np.diff(Z, 2, axis=1)**2, axis=1))
+    return vcurve_lambda(lams, fit.reshape(len(lams), -1), pen.reshape(len(lams), -1))
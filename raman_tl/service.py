@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+local HTTP / WebSocket processing service with a warm worker pool
+
+python -m raman_tl --serve [HOST:]PORT [-j N] [processing options, defaults of the requests]
+
+  GET  /health   {"status": "ok", "version": ..., "jobs": ..., "restarts": ...}
+                 503 {"status": "broken", "error": ...} while a broken pool is replaced
+  POST /process  spectra as text file uploads (multipart/form-data, format of test.txt) or JSON
+                 {"spectra": [{"name": ..., "freq": [...], "intens": [...]}, ...], "options": {...}}
+                 options: fields of processing.Options, they replace the defaults of the service
+                 the response is streamed (NDJSON, chunked), one line per spectrum as soon as it
+                 is processed, "index" is the position of the spectrum in the request
+                 ?arrays=0 (or "arrays": false): peaks only, without freq, baseline and filtered
+  GET  /ws       WebSocket, every text message is a JSON request as for /process,
+                 every spectrum is answered with one text message (same JSON as an NDJSON line)
+
+every spectrum is one task (process_spectrum) in a pool of worker processes started and warmed up
+(watch.warm_up) with the service, spectra of concurrent requests are spread over all workers,
+with -j 1 they are processed one at a time in a thread of the service process (imports and
+penalty bands stay loaded)
+
+only the standard library is used (http.server, a minimal RFC 6455 WebSocket),
+the service listens on 127.0.0.1 by default and is meant for the local machine
+'''
+
+import io                                               #uploaded files
+import json                                             #requests and responses
+import time                                             #warm up, monitor interval
+import base64                                           #WebSocket handshake
+import struct                                           #WebSocket frames
+import hashlib                                          #WebSocket handshake
+import threading                                        #pool monitor
+from email.parser import BytesParser                    #multipart/form-data
+from email.policy import HTTP                           #multipart/form-data
+from urllib.parse import urlsplit, parse_qs             #query string
+from dataclasses import fields, replace                 #options of a request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler    #HTTP server
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed    #warm pool
+from concurrent.futures.process import BrokenProcessPool    #killed worker process
+import numpy as np                                      #for several calculations
+from . import __version__                               #code version
+from .fileio import load_spectrum, spectrum_name        #read uploaded spectra
+from .processing import Options, process_spectrum       #processing pipeline
+from .parallel import default_jobs                      #number of cores
+from .watch import warm_up                              #warm up the workers
+
+service_host = '127.0.0.1'                  #default host, local machine only
+max_request = 256 * 1024**2                 #max. request size in bytes
+websocket_guid = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'    #RFC 6455 handshake
+
+#process one spectrum, runs in a worker process (or in the worker thread with -j 1)
+def process_one(name, freq, intens, options):
+    return process_spectrum(name, freq, intens, options)
+
+#hands every spectrum to the pool as its own task, submit returns a Future of the SpectrumResult
+#(one spectrum per task, the spectra of a request are spread over all workers)
+#new_executor: creates the pool (ProcessPoolExecutor, -j 1: one thread), a broken pool
+#(e.g. a killed worker) is replaced by a new one, the spectra in the broken pool get the error,
+#broken is the error until the pool is replaced (by a monitor thread or the next submit)
+class SpectrumPool:
+    def __init__(self, new_executor):
+        self.new_executor = new_executor
+        self.executor = new_executor()
+        self.broken = None                  #error of the broken pool, None: pool ok
+        self.restarts = 0                   #replaced pools
+        self.lock = threading.Lock()        #one restart at a time
+        threading.Thread(target=self.monitor, daemon=True).start()
+
+    def submit(self, name, freq, intens, options):
+        freq, intens = np.asarray(freq, dtype=float), np.asarray(intens, dtype=float)
+        with self.lock:
+            if self.pool_error() is not None:
+                self.restart()
+            try:
+                future = self.executor.submit(process_one, name, freq, intens, options)
+            except BrokenProcessPool:
+                self.restart()
+                future = self.executor.submit(process_one, name, freq, intens, options)
+        future.add_done_callback(self.done)
+        return future
+
+    #a task failed with a broken pool: the pool is replaced
+    def done(self, future):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self.broken = str(future.exception())
+
+    #replace a broken pool without waiting for the next request
+    def monitor(self):
+        while True:
+            time.sleep(1)
+            with self.lock:
+                if self.pool_error() is not None:
+                    self.restart()
+
+    #error of a broken pool (a worker process died), None: pool ok
+    def pool_error(self):
+        if self.broken is None:
+            try:
+                self.executor.submit(int)
+            except BrokenProcessPool as error:
+                self.broken = str(error)
+            except RuntimeError:
+                #pool shut down, replaced or stopping
+                pass
+        return self.broken
+
+    #replace the broken pool, the caller holds the lock
+    def restart(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self.new_executor()
+        self.broken = None
+        self.restarts += 1
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+#options of a request: fields of Options in data replace the defaults, raises ValueError for unknown fields
+def request_options(data, defaults):
+    names = {field.name for field in fields(Options)}
+    unknown = set(data) - names
+    if unknown:
+        raise ValueError(f"unknown options: {', '.join(sorted(unknown))}")
+    if data.get('wp') is not None:
+        data = dict(data, wp=tuple(int(value) for value in data['wp']))
+    return replace(defaults, **data)
+
+#spectra of a JSON request, returns a list of (name, freq, intens) and the options
+#raises ValueError for invalid requests
+def json_spectra(data, defaults):
+    try:
+        request = json.loads(data)
+        spectra = [(str(spectrum.get('name', index)), np.asarray(spectrum['freq'], dtype=float),
+                    np.asarray(spectrum['intens'], dtype=float))
+                   for index, spectrum in enumerate(request['spectra'])]
+        options = request_options(request.get('options') or {}, defaults)
+    except (KeyError, TypeError, AttributeError) as error:
+        raise ValueError(f"invalid request: {error!r}")
+    for name, freq, intens in spectra:
+        if freq.ndim != 1 or freq.shape != intens.shape:
+            raise ValueError(f"'{name}': freq and intens must be lists of the same length")
+    return spectra, options, request.get('arrays', True)
+
+#spectra of a multipart/form-data request (text files), returns a list of (name, freq, intens)
+#raises ValueError for invalid requests or files
+def multipart_spectra(data, content_type):
+    message = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + data)
+    if not message.is_multipart():
+        raise ValueError("invalid multipart/form-data request")
+    spectra = list()
+    for part in message.iter_parts():
+        filename = part.get_filename()
+        if filename is None:
+            continue
+        freq, intens = load_spectrum(io.BytesIO(part.get_payload(decode=True)))
+        spectra.append((spectrum_name(filename), freq, intens))
+    return spectra
+
+#JSON of a SpectrumResult, index: position in the request, arrays: with freq, baseline and filtered
+def result_json(index, result, arrays=True):
+    options = result.options
+    data = {'index': index, 'name': result.name,
+            'lam': options.lam, 'whittaker_lmd': None if options.wp else options.whittaker_lmd,
+            'start': result.start, 'stop': result.stop, 'threshold': result.threshold,
+            'peaks': result.peakz.tolist(), 'peak_heights': result.filtered[result.crop][result.peaks].tolist()}
+    if arrays:
+        data.update(freq=result.freq.tolist(), baseline=result.baseline.tolist(),
+                    filtered=result.filtered.tolist())
+    return json.dumps(data)
+
+#submit spectra, yields the JSON line of every spectrum as soon as it is processed
+def process_request(pool, spectra, options, arrays=True):
+    futures = {pool.submit(name, freq, intens, options): index for index, (name, freq, intens) in enumerate(spectra)}
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            yield result_json(index, future.result(), arrays)
+        except Exception as error:
+            yield json.dumps({'index': index, 'name': spectra[index][0], 'error': str(error)})
+
+#HTTP and WebSocket requests, the server holds the pool, the default options and the number of jobs
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    #no log line per request
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/health':
+            pool = self.server.pool
+            error = pool.pool_error()
+            if error is not None:
+                self.send_json(503, {'status': 'broken', 'error': error, 'version': __version__,
+                                     'jobs': self.server.jobs, 'restarts': pool.restarts})
+            else:
+                self.send_json(200, {'status': 'ok', 'version': __version__, 'jobs': self.server.jobs,
+                                     'restarts': pool.restarts})
+        elif path == '/ws' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self.websocket()
+        else:
+            self.send_json(404, {'error': f"not found: {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/process':
+            self.send_json(404, {'error': f"not found: {url.path}"})
+            return
+        #the body is not read if the length is missing or invalid, the connection is closed
+        length = self.headers.get('Content-Length')
+        try:
+            length = int(length) if length is not None else None
+        except ValueError:
+            length = -1
+        if length is None:
+            self.close_connection = True
+            self.send_json(411, {'error': "Content-Length required"})
+            return
+        if length < 0:
+            self.close_connection = True
+            self.send_json(400, {'error': f"invalid Content-Length: '{self.headers.get('Content-Length')}'"})
+            return
+        if length > max_request:
+            self.close_connection = True
+            self.send_json(413, {'error': f"request larger than {max_request} bytes"})
+            return
+        data = self.rfile.read(length)
+        content_type = self.headers.get('Content-Type', '')
+        arrays = parse_qs(url.query).get('arrays', ['1'])[0] not in ('0', 'false')
+        try:
+            if content_type.startswith('multipart/form-data'):
+                spectra, options = multipart_spectra(data, content_type), self.server.options
+            else:
+                spectra, options, requested = json_spectra(data, self.server.options)
+                arrays = arrays and requested
+        except (ValueError, OSError) as error:
+            self.send_json(400, {'error': str(error)})
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for line in process_request(self.server.pool, spectra, options, arrays):
+            chunk = line.encode() + b'\n'
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b'\r\n')
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    #WebSocket connection: handshake, then one JSON request per text message
+    def websocket(self):
+        key = self.headers.get('Sec-WebSocket-Key', '')
+        accept = base64.b64encode(hashlib.sha1((key + websocket_guid).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.close_connection = True
+        while True:
+            opcode, payload = read_frame(self.rfile)
+            if opcode is None or opcode == 0x8:
+                write_frame(self.wfile, 0x8, b'')
+                return
+            if opcode == 0x9:
+                write_frame(self.wfile, 0xA, payload)
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                spectra, options, arrays = json_spectra(payload, self.server.options)
+            except ValueError as error:
+                write_frame(self.wfile, 0x1, json.dumps({'error': str(error)}).encode())
+                continue
+            for line in process_request(self.server.pool, spectra, options, arrays):
+                write_frame(self.wfile, 0x1, line.encode())
+
+#read a WebSocket message (fragments joined), returns opcode and payload, (None, b'') if the connection closed
+def read_frame(rfile):
+    message = b''
+    message_opcode = None
+    while True:
+        header = rfile.read(2)
+        if len(header) < 2:
+            return None, b''
+        fin, opcode = header[0] & 0x80, header[0] & 0x0F
+        masked, length = header[1] & 0x80, header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', rfile.read(8))[0]
+        if length > max_request:
+            return None, b''
+        mask = rfile.read(4) if masked else None
+        payload = rfile.read(length)
+        if mask:
+            payload = (np.frombuffer(payload, dtype=np.uint8) ^
+                       np.resize(np.frombuffer(mask, dtype=np.uint8), length)).tobytes()
+        #control frames can come between the fragments of a message
+        if opcode >= 0x8:
+            return opcode, payload
+        if opcode:
+            message_opcode = opcode
+        message += payload
+        if fin:
+            return message_opcode, message
+
+#write one unmasked WebSocket frame (server to client)
+def write_frame(wfile, opcode, payload):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('>BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('>BBQ', 0x80 | opcode, 127, length)
+    wfile.write(header + payload)
+    wfile.flush()
+
+#parse "[HOST:]PORT", returns host and port
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or service_host, int(port)
+
+#pool of jobs worker processes, all workers are started and warmed up (watch.warm_up) before it is returned
+def warm_pool(options, jobs):
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=warm_up, initargs=(options,))
+    for future in [executor.submit(time.sleep, 0) for _ in range(jobs)]:
+        future.result()
+    return executor
+
+#start the service on address ([HOST:]PORT) with default options, jobs worker processes
+#(0: all cores, 1: one thread in this process), runs until Ctrl+C
+def serve(address, options, jobs=1):
+    host, port = parse_address(address)
+    if not jobs:
+        jobs = default_jobs()
+    if jobs > 1:
+        new_executor = lambda: warm_pool(options, jobs)
+    else:
+        #penalty bands and imports of the processing pipeline (warm_up would ignore Ctrl+C here)
+        x = np.linspace(0, 1, 64)
+        process_one('warm-up', x, np.random.default_rng(0).normal(size=64), options)
+        new_executor = lambda: ThreadPoolExecutor(max_workers=1)
+    #the pool is started before the socket is bound, the workers do not hold the listening socket
+    pool = SpectrumPool(new_executor)
+    try:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+    except OSError:
+        pool.shutdown()
+        raise
+    server.daemon_threads = True
+    server.pool = pool
+    server.options = options
+    server.jobs = jobs
+    print(f"raman-tl service on http://{host}:{server.server_port} ({jobs} worker process(es)), Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        server.server_close()
+        pool.shutdown()
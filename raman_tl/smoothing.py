@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+
+# Whittaker filter / smoothing adapted from several sources based on:
+"A perfect smoother"
+Paul H. C. Eilers
+Anal. Chem. 2003, 75, 3631-3636
+DOI: https://doi.org/10.1021/ac034173t
+
+# Whittaker paper
+"On a new method of gradutation"
+E. T. Whittaker
+Proceedings of the Edinburgh Mathematical Society 1922, 41, 63-75
+DOI: https://doi.org/10.1017/S0013091500077853
+
+'''
+
+import numpy as np                                      #for several calculations
+from scipy.signal import savgol_filter                  #Savitzky–Golay filter
+from .solvers import solve_banded                       #banded solver for Whittaker
+
+whittaker_lmd = 1                           #default lamda for the Whittaker filter
+
+#Whittaker filter (smoothing)
+def whittaker(y,lmd = 2, d = 2):
+    #lmd: smoothing parameter lamda,
+    #the suggested value of lamda = 1600 seems way to much for Raman spectra
+    #d: order of differences in penalty (2)
+    #(I + lmd * D'D) z = y is solved in banded form, memory is linear in len(y)
+    y = np.asarray(y, dtype=float)
+    L = len(y)
+    z = solve_banded(np.ones(L), y, lmd, d)
+    return z
+
+#Savitzky–Golay filter (smoothing)
+def savgol(y, wl, po):
+    #wl: window length, positive odd number
+    #po: polynomial order, po < wl
+    return savgol_filter(y, wl, po)
+
+#parse "WINDOWLENGTH:POLYORDER" for the Savitzky–Golay filter
+#delimiter is ":" because of win10 issues
+def parse_wp(wp):
+    wl, po = wp.split(':')[:2]
+    return int(wl), int(po)
+
+#smoothing as selected on the command line:
+#Savitzky–Golay if wp = (wl, po) is given, else Whittaker with lmd (lmd = 1 if not set)
+def smooth(y, wp=None, lmd=whittaker_lmd):
+    if wp:
+        return savgol(y, *wp)
+    elif lmd:
+        return whittaker(y, lmd=lmd)
+    else:
+        return whittaker(y, lmd=1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+streaming processing of large batches with bounded memory
+
+the files are read and processed in chunks of stream_chunk spectra (process_spectra,
+'auto' lambdas selected for a chunk at once), stream_spectra yields every result as soon as its chunk is done,
+the caller exports it and drops it, only a chunk of spectra is in memory at a time
+map files (SPC, NPY) are memory-mapped, their spectra are read chunk by chunk as well
+
+the summary, overlay and stacked plots of a stream show an evenly spaced selection
+of at most stream_keep spectra (select_spectra)
+'''
+
+import fnmatch                                          #name patterns
+import numpy as np                                      #for several calculations
+from .fileio import file_spectra, spectrum_name         #read spectra
+from .mapio import is_map, map_size, map_name           #memory-mapped map files
+from .processing import process_spectra                 #processing pipeline
+from .cache import process_file_cached                  #on-disk cache
+
+stream_chunk = 64                           #spectra per chunk, loaded and processed before they are yielded
+stream_keep = 12                            #spectra kept for the summary, overlay and stacked plots
+
+#indices of at most keep evenly spaced spectra out of n (first and last included)
+def select_spectra(n, keep=stream_keep):
+    if n <= keep:
+        return list(range(n))
+    return sorted(set(np.linspace(0, n - 1, keep).round().astype(int).tolist()))
+
+#number of spectra in filenames (one per text file, header of map files), unreadable maps count 0
+#pattern: only spectra with a name matching pattern (fnmatch, None: all)
+def count_spectra(filenames, pattern=None):
+    count = 0
+    for filename in filenames:
+        try:
+            n = map_size(filename) if is_map(filename) else 1
+        except (IOError, ValueError):
+            continue
+        if pattern is None:
+            count += n
+        elif is_map(filename):
+            count += sum(fnmatch.fnmatch(map_name(filename, index, n), pattern) for index in range(n))
+        else:
+            count += fnmatch.fnmatch(spectrum_name(filename), pattern)
+    return count
+
+#process the spectra of a chunk [(filename, name, freq, intens)], yields (filename, SpectrumResult)
+def process_chunk(spectra, options):
+    if not spectra:
+        return
+    freqdict = {name: freq for _, name, freq, _ in spectra}
+    intensdict = {name: intens for _, name, _, intens in spectra}
+    run = process_spectra(freqdict, intensdict, options)
+    for filename, name, _, _ in spectra:
+        yield filename, run.spectra[name]
+
+#load and process filenames chunk by chunk, yields (filename, SpectrumResult) in input order
+#(one result per spectrum, several for map files)
+#files that can not be loaded are appended to failed as (filename, exception) and skipped,
+#without a failed list the exception is raised
+#cache: ResultCache or None (no cache), with a cache every text file is looked up on its own
+def stream_spectra(filenames, options, chunk=stream_chunk, failed=None, cache=None):
+    spectra = list()                        #(filename, name, freq, intens) of the chunk
+    for filename in filenames:
+        if cache is not None and not is_map(filename):
+            #keep the input order: the chunk before the file first
+            yield from process_chunk(spectra, options)
+            spectra = list()
+            try:
+                result = process_file_cached(filename, options, cache)
+            except (IOError, ValueError) as error:
+                if failed is None:
+                    raise
+                failed.append((filename, error))
+                continue
+            yield filename, result
+            continue
+        loading = file_spectra(filename)
+        while True:
+            try:
+                name, freq, intens = next(loading)
+            except StopIteration:
+                break
+            except (IOError, ValueError) as error:
+                if failed is None:
+                    raise
+                failed.append((filename, error))
+                break
+            spectra.append((filename, name, freq, intens))
+            if len(spectra) >= chunk:
+                yield from process_chunk(spectra, options)
+                spectra = list()
+    yield from process_chunk(spectra, options)
+    if cache is not None:
+        cache.evict()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+watch folder: process new spectra as soon as they are written
+
+new files are detected with inotify (Linux, close after write or moved into the folder),
+other systems poll the folder, a file is complete if size and modification time did not
+change between two polls
+
+the files are processed in a pool of worker processes that stay alive, numpy, scipy and
+the processing modules are loaded by warm_up before the first spectrum arrives and the
+penalty band of a spectrum length stays cached in the worker,
+every worker writes the -mod.csv file of its spectrum immediately
+'''
+
+import os                                               #os file processing
+import time                                             #timing, polling
+import select                                           #wait for inotify events
+import signal                                           #Ctrl+C only stops the parent
+import struct                                           #inotify events
+import fnmatch                                          #file name pattern
+import ctypes                                           #inotify from libc
+import ctypes.util                                      #find libc
+from concurrent.futures import ProcessPoolExecutor     #process pool
+import numpy as np                                      #for several calculations
+from .fileio import save_dat                            #save data
+from .processing import process_spectrum                #processing pipeline
+from .parallel import process_file, default_jobs        #load and process one file
+
+watch_pattern = '*.txt'                     #file name pattern of new spectra
+poll_interval = 0.5                         #seconds between two polls (no inotify)
+IN_CLOSE_WRITE = 0x08                       #inotify: file opened for writing was closed
+IN_MOVED_TO = 0x80                          #inotify: file moved into the folder
+inotify_event = struct.Struct('iIII')       #wd, mask, cookie, len (name follows)
+evict_every = 10                            #processed files between two evictions of the cache (size limit)
+
+#paths of files in folder matching pattern, completed after the start, via inotify
+#returns None if inotify is not available
+def inotify_files(folder, pattern=watch_pattern):
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init()
+    except (OSError, AttributeError, TypeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return read_inotify(fd, folder, pattern)
+
+#generator over the inotify events of fd
+def read_inotify(fd, folder, pattern):
+    try:
+        while True:
+            select.select([fd], [], [])
+            data = os.read(fd, 65536)
+            position = 0
+            while position < len(data):
+                _, _, _, length = inotify_event.unpack_from(data, position)
+                position += inotify_event.size
+                name = os.fsdecode(data[position:position + length].rstrip(b'\0'))
+                position += length
+                if fnmatch.fnmatch(name, pattern):
+                    yield os.path.join(folder, name)
+    finally:
+        os.close(fd)
+
+#paths of files in folder matching pattern, new or changed after the start, via polling
+#a file is reported when size and modification time are the same in two polls
+def poll_files(folder, pattern=watch_pattern, interval=poll_interval):
+    def scan():
+        found = dict()
+        for entry in os.scandir(folder):
+            if entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                found[entry.path] = (stat.st_size, stat.st_mtime)
+        return found
+    done = scan()                           #path -> (size, mtime) when reported or at the start
+    last = done
+    while True:
+        time.sleep(interval)
+        current = scan()
+        for path, state in current.items():
+            if last.get(path) == state and done.get(path) != state:
+                done[path] = state
+                yield path
+        last = current
+
+#new files: inotify, polling if inotify is not available
+def watch_files(folder, pattern=watch_pattern, interval=poll_interval):
+    files = inotify_files(folder, pattern)
+    if files is None:
+        return poll_files(folder, pattern, interval)
+    return files
+
+#worker process initializer: imports are loaded before the first file, Ctrl+C is handled by the parent
+def warm_up(options):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    x = np.linspace(0, 1, 64)
+    process_spectrum('warm-up', x, np.random.default_rng(0).normal(size=64), options)
+
+#load, process and save one file as -mod.csv, runs in the worker process
+#dat_format: keyword arguments of save_dat, the file is written atomically by default
+#returns the name of the spectrum and the processing time in seconds
+def process_and_save(filename, options, file_output_path, cache=None, dat_format=None):
+    start = time.perf_counter()
+    result = process_file(filename, options, cache)
+    dat_format = dict({'atomic': True}, **(dat_format or {}))
+    save_dat(os.path.join(file_output_path, result.name + "-mod.csv"),
+             result.freq[result.crop], result.filtered[result.crop], **dat_format)
+    return result.name, time.perf_counter() - start
+
+#watch folder and process every new spectrum in a pool of jobs worker processes (jobs = 0: all cores)
+#runs until it is interrupted (Ctrl+C)
+#cache: the workers save the entries, the size limit is enforced here every evict_every files and at the end
+def watch(folder, options, file_output_path, pattern=watch_pattern, jobs=0, cache=None,
+          interval=poll_interval, dat_format=None):
+    if not jobs:
+        jobs = default_jobs()
+
+    processed = 0                           #files since the last eviction
+
+    def report(filename, future):
+        nonlocal processed
+        try:
+            name, seconds = future.result()
+        except Exception as error:
+            print(f"Warning! '{filename}' could not be processed: {error}")
+            return
+        print(f"{name}: {seconds:.3f} s")
+        if cache is not None:
+            processed += 1
+            if processed >= evict_every:
+                processed = 0
+                cache.evict()
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=warm_up, initargs=(options,)) as executor:
+        #start all workers now, not with the first spectrum
+        for future in [executor.submit(time.sleep, 0) for _ in range(jobs)]:
+            future.result()
+        print(f"watching '{folder}' ({pattern}), Ctrl+C to stop")
+        try:
+            for filename in watch_files(folder, pattern, interval):
+                future = executor.submit(process_and_save, filename, options, file_output_path, cache, dat_format)
+                future.add_done_callback(lambda future, filename=filename: report(filename, future))
+        except KeyboardInterrupt:
+            print("stopped")
+    if cache is not None:
+        cache.evict()